@@ -3,12 +3,21 @@ from config import Config
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app.database import engine_options, RoutingSession, init_replica_routing
 
 app = Flask(__name__)
 app.config.from_object(Config)
 app.config['UPLOAD_FOLDER'] = 'app/static/assets/images'  
-db= SQLAlchemy(app)
+if app.config['PROXY_FIX_HOPS']:
+    hops = app.config['PROXY_FIX_HOPS']
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+if app.config['DB_REPLICA_URI']:
+    app.config['SQLALCHEMY_BINDS'] = {'replica': app.config['DB_REPLICA_URI']}
+db= SQLAlchemy(app, session_options={'class_': RoutingSession})
+init_replica_routing(app)
 migrate = Migrate(app,db)
 login = LoginManager(app)
 
-from app import routes,models
+from app import routes,models,identity,compression
@@ -0,0 +1,59 @@
+from app import app
+from flask import request, url_for
+import hashlib
+import os
+
+# a year, the longest max-age browsers respect
+IMMUTABLE_MAX_AGE = 31536000
+
+_hashes = {}
+
+
+def file_hash(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+# hash of a file in the static folder, only recomputed when the file changes
+def static_hash(filename):
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _hashes.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, file_hash(path)[:12])
+        _hashes[path] = cached
+    return cached[1]
+
+
+# url_for('static', ...) with the content hash in the url, a new version of the file gets a new url
+@app.template_global()
+def static_url(filename):
+    version = static_hash(filename)
+    if version is None:
+        return url_for('static', filename=filename)
+    return url_for('static', filename=filename, v=version)
+
+
+# stores an uploaded file under the hash of its content, uploading the same image twice stores it once
+# and a different image with the same name never overwrites the first one
+def save_upload(file_storage, folder, filename):
+    content = file_storage.read()
+    extension = os.path.splitext(filename)[1].lower()
+    hashed_name = hashlib.sha256(content).hexdigest()[:32] + extension
+    path = os.path.join(folder, hashed_name)
+    is_new = not os.path.exists(path)
+    if is_new:
+        with open(path, 'wb') as file:
+            file.write(content)
+    return hashed_name, is_new
+
+
+# fingerprinted urls never change content, so browsers can keep them for a year without asking again
+@app.after_request
+def cache_fingerprinted_assets(response):
+    if request.endpoint == 'static' and request.args.get('v') and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
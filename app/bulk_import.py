@@ -0,0 +1,187 @@
+from app import app, db
+from app.cache import page_cache
+from app.forms import AddProductForm, IMAGE_EXTENSIONS
+from app.models import Product, Category
+from app.assets import save_upload
+from app.image_jobs import create_image_job
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.utils import secure_filename
+import sqlalchemy as sa
+import click
+import csv
+import json
+import os
+
+IMPORT_BATCH_SIZE = 500
+DEFAULT_IMAGE = 'default_product_image.jpg'
+
+
+# (row number, fields) for every record, csv rows are numbered by their line in the file
+def read_records(stream, filename):
+    if filename.lower().endswith('.csv'):
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    # a json array is read at once, json lines are read one line at a time
+    first = stream.read(1)
+    skipped_lines = 0
+    while first.isspace():
+        skipped_lines += first == '\n'
+        first = stream.read(1)
+    if first == '[':
+        for number, row in enumerate(json.loads(first + stream.read()), start=1):
+            yield number, row
+        return
+
+    # every line stands on its own, a broken line is reported as that row's error
+    for number, line in enumerate(stream, start=skipped_lines + 1):
+        if number == skipped_lines + 1:
+            line = first + line
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, e
+
+
+# the same rules as the add product form, the category only has to be named here because it is created when missing.
+# building a form costs more than validating it, an import passes one form that is filled again for every row
+def validate_record(row, form=None):
+    if isinstance(row, ValueError):
+        return None, [f'invalid json: {row}']
+    if not isinstance(row, dict):
+        return None, ['not an object']
+    category = str(row.get('category') or '').strip()
+    if form is None:
+        form = AddProductForm(formdata=None, meta={'csrf': False})
+    form.process(MultiDict({
+        'name': str(row.get('name') or '').strip(),
+        'description': str(row.get('description') or '').strip(),
+        'price': str(row.get('price') or '').strip(),
+        'category': '-1' if category else '',
+    }))
+    form.category.choices = [(-1, category)]
+
+    errors = []
+    if not form.validate():
+        errors = [f'{name}: {message}' for name, messages in form.errors.items() for message in messages]
+    image = str(row.get('image') or '').strip()
+    if image and os.path.splitext(image)[1].lower().lstrip('.') not in IMAGE_EXTENSIONS:
+        errors.append(f'image: File does not have an approved extension: {", ".join(IMAGE_EXTENSIONS)}')
+    if errors:
+        return None, errors
+
+    return {'name': form.name.data, 'description': form.description.data, 'price': float(form.price.data),
+            'category': category, 'image': image}, []
+
+
+# an image reference is a file in images_folder (copied like an upload) or a file that was uploaded before
+def resolve_image(image, images_folder, image_jobs):
+    if not image:
+        return DEFAULT_IMAGE
+    if images_folder:
+        path = os.path.join(images_folder, image)
+        if os.path.isfile(path):
+            with open(path, 'rb') as file:
+                filename, is_new = save_upload(FileStorage(file), app.config['UPLOAD_FOLDER'], secure_filename(image))
+            if is_new:
+                image_jobs.append(create_image_job(filename))
+            return filename
+    if os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(image))):
+        return secure_filename(image)
+    raise ValueError(f'image: {image} not found')
+
+
+# creates the categories this batch needs in one insert, categories holds name -> id for all of them
+def resolve_categories(names, categories):
+    missing = sorted(names - categories.keys())
+    if not missing:
+        return 0
+    rows = db.session.execute(sa.insert(Category).returning(Category.id, Category.name),
+                              [{'name': name} for name in missing])
+    categories.update({name: category_id for category_id, name in rows})
+    return len(missing)
+
+
+def import_batch(batch, categories, images_folder, result):
+    products = []
+    image_jobs = []
+    numbers = []
+    for number, record in batch:
+        try:
+            record['image_filename'] = resolve_image(record['image'], images_folder, image_jobs)
+        except ValueError as e:
+            result['errors'].append((number, [str(e)]))
+            continue
+        products.append(record)
+        numbers.append(number)
+    if not products:
+        return
+
+    try:
+        created = resolve_categories({record['category'] for record in products}, categories)
+        db.session.execute(sa.insert(Product), [
+            {'name': record['name'], 'description': record['description'], 'price': record['price'],
+             'category_id': categories[record['category']], 'image_filename': record['image_filename']}
+            for record in products])
+        db.session.commit()
+    except sa.exc.SQLAlchemyError as e:
+        db.session.rollback()
+        # the categories created by this batch are gone again
+        categories.clear()
+        categories.update(dict(db.session.query(Category.name, Category.id)))
+        result['errors'].extend((number, [f'batch failed: {e.__class__.__name__}']) for number in numbers)
+        return
+
+    result['imported'] += len(products)
+    result['categories_created'] += created
+    result['image_jobs'].extend(job.id for job in image_jobs)
+
+
+# validates every record, then inserts the valid ones a batch per transaction.
+# a bad row is reported and skipped, the rest of the file still goes in
+def import_products(records, images_folder=None, batch_size=IMPORT_BATCH_SIZE):
+    result = {'imported': 0, 'categories_created': 0, 'errors': [], 'image_jobs': []}
+    # all known categories in one lookup, new names are added per batch
+    categories = dict(db.session.query(Category.name, Category.id))
+
+    form = AddProductForm(formdata=None, meta={'csrf': False})
+    batch = []
+    try:
+        for number, row in records:
+            record, errors = validate_record(row, form)
+            if errors:
+                result['errors'].append((number, errors))
+                continue
+            batch.append((number, record))
+            if len(batch) >= batch_size:
+                import_batch(batch, categories, images_folder, result)
+                batch = []
+    except (ValueError, csv.Error) as e:
+        # the file itself is broken from here on, the batches before stay imported
+        result['errors'].append((None, [f'file: {e}']))
+    if batch:
+        import_batch(batch, categories, images_folder, result)
+
+    if result['imported']:
+        page_cache.invalidate('index', 'category', 'new_items', 'facets')
+    return result
+
+
+@app.cli.command('import-products')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--images', type=click.Path(exists=True, file_okay=False), help='Folder with the images the file refers to.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, help='Number of products per transaction.')
+def import_products_command(path, images, batch_size):
+    """Import products and categories from a CSV or JSON file."""
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        result = import_products(read_records(stream, path), images_folder=images, batch_size=batch_size)
+
+    for number, errors in result['errors']:
+        click.echo(f'row {number}: {"; ".join(errors)}' if number else '; '.join(errors), err=True)
+    click.echo(f'Imported {result["imported"]} products, created {result["categories_created"]} categories, '
+               f'{len(result["errors"])} rows with errors.')
+    if result['image_jobs']:
+        click.echo(f'{len(result["image_jobs"])} images are waiting to be resized, run flask image-jobs-run.')
@@ -0,0 +1,115 @@
+from app import app
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session
+from flask_login import current_user
+from werkzeug.utils import import_string
+import threading
+import time
+
+
+# in memory LRU cache, the default backend for the page cache
+class LRUCache:
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+# a backend that never stores anything, to switch the cache off
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+# other backends (redis, memcached, ...) only need the same get/set/delete/clear methods
+def create_backend(name):
+    if name == 'memory':
+        return LRUCache(app.config['PAGE_CACHE_SIZE'])
+    if name == 'null':
+        return NullCache()
+    return import_string(name)()
+
+
+# rendered catalog pages for anonymous visitors
+# every group has a version number in the backend, invalidating a group bumps it so old pages are never read again
+class PageCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def version(self, group):
+        return self.backend.get(f'version:{group}') or 0
+
+    def key(self, group):
+        return f'page:{group}:{self.version(group)}:{request.full_path}'
+
+    # a value computed once per version of the group, e.g. the catalog version for the etags
+    def value(self, group, name, func):
+        key = f'value:{group}:{self.version(group)}:{name}'
+        value = self.backend.get(key)
+        if value is None:
+            value = func()
+            self.backend.set(key, value, app.config['PAGE_CACHE_TTL'])
+        return value
+
+    def invalidate(self, *groups):
+        for group in groups:
+            self.backend.set(f'version:{group}', self.version(group) + 1)
+
+    # ttl is PAGE_CACHE_TTL unless the group's content expires sooner on its own
+    def cached(self, group, ttl=None):
+        def decorator(func):
+            @wraps(func)
+            def decorated_function(*args, **kwargs):
+                # logged in users see their own menu and flashed messages belong to one visitor
+                if current_user.is_authenticated or '_flashes' in session:
+                    return func(*args, **kwargs)
+                key = self.key(group)
+                page = self.backend.get(key)
+                if page is None:
+                    page = func(*args, **kwargs)
+                    if isinstance(page, str):
+                        self.backend.set(key, page, ttl or app.config['PAGE_CACHE_TTL'])
+                return page
+            return decorated_function
+        return decorator
+
+
+page_cache = PageCache(create_backend(app.config['PAGE_CACHE_BACKEND']))
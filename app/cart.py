@@ -0,0 +1,61 @@
+from app import db
+from app.models import Product, CartItem, OrderItem
+from sqlalchemy.orm import joinedload
+import sqlalchemy as sa
+
+
+# the cart items with their products in one joined query, so the templates don't lazy load every product
+# with lock=True the cart rows are locked with SELECT ... FOR UPDATE until the transaction ends
+def get_cart_items(user_id, lock=False):
+    query = CartItem.query.options(joinedload(CartItem.product)) \
+                          .filter_by(user_id=user_id) \
+                          .order_by(CartItem.id)
+    if lock:
+        query = query.with_for_update(of=CartItem)
+    return query.all()
+
+
+# the total is computed by the database, returns 0 for an empty cart
+def get_cart_total(user_id):
+    total = db.session.query(sa.func.sum(CartItem.quantity * Product.price)) \
+                      .join(Product, Product.id == CartItem.product_id) \
+                      .filter(CartItem.user_id == user_id) \
+                      .scalar()
+    return total or 0
+
+
+def get_order_items(order_id):
+    return OrderItem.query.options(joinedload(OrderItem.product)) \
+                          .filter_by(order_id=order_id) \
+                          .order_by(OrderItem.id) \
+                          .all()
+
+
+# adds the quantities ({product_id: quantity}) to the user's cart with one INSERT ... ON CONFLICT DO UPDATE,
+# so concurrent clicks add up in the database instead of overwriting each other
+def add_cart_items(user_id, quantities):
+    if not quantities:
+        return
+    rows = [dict(user_id=user_id, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()]
+    dialect = db.engine.dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(CartItem).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CartItem.user_id, CartItem.product_id],
+            set_={'quantity': CartItem.quantity + statement.excluded.quantity})
+        db.session.execute(statement)
+        return
+
+    # other databases: increment in SQL and only insert the rows that did not exist yet
+    for row in rows:
+        updated = CartItem.query.filter_by(user_id=user_id, product_id=row['product_id']) \
+                                .update({CartItem.quantity: CartItem.quantity + row['quantity']},
+                                        synchronize_session=False)
+        if not updated:
+            db.session.add(CartItem(**row))
@@ -0,0 +1,34 @@
+from app import db
+from app.models import Product
+import sqlalchemy as sa
+
+PRODUCTS_PER_CATEGORY = 8
+CATEGORY_PER_PAGE = 12
+
+
+# the newest products of every category in one query, grouped in one pass
+def products_per_category(limit=PRODUCTS_PER_CATEGORY):
+    rank = sa.func.row_number().over(partition_by=Product.category_id,
+                                     order_by=(Product.created_at.desc(), Product.id.desc())).label('rank')
+    ranked = sa.select(Product.id, rank).subquery()
+    products = Product.query.join(ranked, ranked.c.id == Product.id) \
+                            .filter(ranked.c.rank <= limit) \
+                            .order_by(Product.category_id, ranked.c.rank) \
+                            .all()
+
+    grouped = {}
+    for product in products:
+        grouped.setdefault(product.category_id, []).append(product)
+    return grouped
+
+
+# number of products per category, so the index knows where to show a "view all" link
+def category_counts():
+    return dict(db.session.query(Product.category_id, sa.func.count(Product.id))
+                          .group_by(Product.category_id))
+
+
+def category_products(category_id, page=1, per_page=CATEGORY_PER_PAGE):
+    return Product.query.filter_by(category_id=category_id) \
+                        .order_by(Product.created_at.desc(), Product.id.desc()) \
+                        .paginate(page=page, per_page=per_page, error_out=False)
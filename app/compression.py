@@ -0,0 +1,120 @@
+from app import app
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+import click
+import gzip
+import mimetypes
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# only text compresses well, images are already compressed
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+
+# br when the client and the server support it, otherwise gzip, otherwise nothing
+def pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+@app.cli.command('assets-compress')
+def assets_compress_command():
+    """Write .gz and .br versions of the text files in the static folder."""
+    for root, dirs, files in os.walk(app.static_folder):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as file:
+                content = file.read()
+            with open(path + '.gz', 'wb') as file:
+                file.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + '.br', 'wb') as file:
+                    file.write(brotli.compress(content, quality=11))
+            click.echo(os.path.relpath(path, app.static_folder))
+
+
+# a copy older than its file was made before the last edit, the file itself is served until assets-compress runs again
+def fresh_copy(filename, suffix):
+    path = safe_join(app.static_folder, filename)
+    try:
+        return path is not None and os.path.getmtime(path + suffix) >= os.path.getmtime(path)
+    except OSError:
+        return False
+
+
+# the static view, serves the precompressed file when there is a fresh one for the encoding the client accepts
+def compressed_static(filename):
+    encoding = pick_encoding()
+    suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+    if suffix and fresh_copy(filename, suffix):
+        response = send_from_directory(app.static_folder, filename + suffix,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = app.send_static_file(filename)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+app.view_functions['static'] = compressed_static
+
+
+def compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=app.config['COMPRESS_LEVEL'])
+        for chunk in chunks:
+            data = compressor.process(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+# compresses the rendered pages, streamed responses are compressed chunk by chunk as they are sent
+@app.after_request
+def compress_response(response):
+    if (request.endpoint == 'static' or response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+        return response
+    encoding = pick_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        if encoding == 'br':
+            response.set_data(brotli.compress(data, quality=app.config['COMPRESS_LEVEL']))
+        else:
+            response.set_data(gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL']))
+
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # a strong etag belongs to one exact body, the compressed body gets its own (see conditional)
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
@@ -0,0 +1,79 @@
+from app import app, db
+from app.models import Product, Category
+from app.cache import page_cache
+from flask import request, session, make_response
+from flask_login import current_user
+from functools import wraps
+import hashlib
+import sqlalchemy as sa
+import time
+
+
+# (last change, number of rows) over products and categories, the count catches deletes.
+# there is no last-modified for the whole catalog: a delete doesn't move max(updated_at), so a client that
+# only sends If-Modified-Since would keep a page with the deleted product. the etag covers deletes
+def query_catalog_version():
+    row = db.session.execute(sa.select(
+        sa.select(sa.func.max(Product.updated_at)).scalar_subquery(),
+        sa.select(sa.func.count(Product.id)).scalar_subquery(),
+        sa.select(sa.func.max(Category.updated_at)).scalar_subquery(),
+        sa.select(sa.func.count(Category.id)).scalar_subquery()
+    )).one()
+    product_updated, product_count, category_updated, category_count = row
+    return None, f'{product_updated}-{product_count}-{category_updated}-{category_count}'
+
+
+# every catalog change in manage_shop_data invalidates the index pages, so the version is kept with them
+def catalog_version():
+    return page_cache.value('index', 'catalog-version', query_catalog_version)
+
+
+# only reads the updated_at column, returns None for a product that doesn't exist
+def product_version(product_id):
+    updated_at = db.session.scalar(sa.select(Product.updated_at).where(Product.id == product_id))
+    if updated_at is None and db.session.get(Product, product_id) is None:
+        return None
+    return updated_at, f'product-{product_id}-{updated_at}'
+
+
+# answers with 304 when the client already has this version of the page, before the view queries or renders anything
+# version_func gets the view arguments and returns (last_modified, version) or None to let the view answer (404)
+def conditional(version_func):
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            version = version_func(**kwargs)
+            if version is None:
+                return func(*args, **kwargs)
+            last_modified, stamp = version
+
+            # the page also shows the menu of the user and a csrf token that expires, so they are part of the etag
+            user = current_user.get_id() if current_user.is_authenticated else 'anonymous'
+            token_period = int(time.time() // ((app.config.get('WTF_CSRF_TIME_LIMIT') or 3600) / 2))
+            etag = hashlib.sha1(f'{stamp}-{user}-{session.get("csrf_token")}-{token_period}'.encode()).hexdigest()
+            # if-modified-since can't tell users apart, so only anonymous pages get a last-modified
+            if not current_user.is_anonymous:
+                last_modified = None
+
+            # compress_response appends the encoding to the etag of a compressed body
+            if request.if_none_match:
+                matched = next((tag for tag in (etag, f'{etag}-gzip', f'{etag}-br')
+                                if request.if_none_match.contains(tag)), None)
+                not_modified = matched is not None
+                if not_modified:
+                    etag = matched
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(func(*args, **kwargs))
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,129 @@
+from flask import current_app, g, session, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+from functools import wraps
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool
+import time
+
+# this module is imported by app/__init__.py before db exists, so it can't import from app
+
+
+# QueuePool that keeps track of how long a request waits for a connection
+# and how often all connections were in use
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.saturated_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        saturated = self.checkedout() >= self.size() + max(self._max_overflow, 0)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.saturated_checkouts += saturated
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+
+# SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* settings, sqlite doesn't pool like postgres so it keeps the defaults
+def engine_options(config):
+    if not config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        return {}
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def pool_metrics(engine):
+    pool = engine.pool
+    metrics = {'status': pool.status()}
+    if isinstance(pool, TimedQueuePool):
+        metrics.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checkouts=pool.checkouts,
+            saturated_checkouts=pool.saturated_checkouts,
+            average_wait_ms=round(pool.total_wait / pool.checkouts * 1000, 3) if pool.checkouts else 0,
+            max_wait_ms=round(pool.max_wait * 1000, 3),
+        )
+    return metrics
+
+
+# db.session, but inside a @replica_reads view the queries go to the 'replica' bind when there is one
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get('use_replica')
+                and 'replica' in self._db.engines):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# remembers that this request wrote something, see stick_to_primary
+@event.listens_for(RoutingSession, 'after_flush')
+def mark_write(session, flush_context):
+    if has_request_context():
+        g.wrote = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def mark_bulk_write(orm_execute_state):
+    if has_request_context() and (orm_execute_state.is_insert or orm_execute_state.is_update
+                                  or orm_execute_state.is_delete):
+        g.wrote = True
+
+
+# DB_STATEMENT_TIMEOUT for every transaction a web request starts, SET LOCAL ends with the transaction
+# so migrations and cli commands like search-reindex or rebuild-sales-rollup run without the limit
+@event.listens_for(RoutingSession, 'after_begin')
+def limit_request_statements(session, transaction, connection):
+    if (has_request_context() and connection.dialect.name == 'postgresql'
+            and current_app.config['DB_STATEMENT_TIMEOUT']):
+        connection.execute(text(f"SET LOCAL statement_timeout = {int(current_app.config['DB_STATEMENT_TIMEOUT'])}"))
+
+
+# for views that only read, everything else keeps using the primary database
+# a visitor that just wrote something reads from the primary for REPLICA_STICKY_SECONDS,
+# so they see their own change even when the replica is behind
+def replica_reads(func):
+    @wraps(func)
+    def decorated_function(*args, **kwargs):
+        g.use_replica = session.get('primary_until', 0) < time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return decorated_function
+
+
+# a streamed body runs after the view returned and replica_reads reset the flag, this keeps the
+# view's choice for the queries made while streaming
+def replica_stream(chunks):
+    use_replica = g.get('use_replica', False)
+
+    def generate():
+        g.use_replica = use_replica
+        try:
+            yield from chunks
+        finally:
+            g.use_replica = False
+    return generate()
+
+
+def init_replica_routing(app):
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('wrote') and 'replica' in app.config.get('SQLALCHEMY_BINDS', {}):
+            session['primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
@@ -0,0 +1,54 @@
+from app import db
+from app.models import Order, OrderItem, Product
+import sqlalchemy as sa
+import csv
+import io
+import json
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = ['order_id', 'date_ordered', 'complete', 'user_id', 'total_price', 'country', 'street',
+                  'postal_number', 'house_number', 'bus_number', 'order_item_id', 'product_id', 'product_name',
+                  'unit_price', 'quantity']
+
+
+# one row per order item with the price paid, fetched a batch at a time through a server-side cursor so memory stays flat
+def export_rows(start=None, end=None, complete=None, batch_size=EXPORT_BATCH_SIZE):
+    query = sa.select(Order.id, Order.date_ordered, Order.complete, Order.user_id, Order.total_price,
+                      Order.country, Order.street, Order.postal_number, Order.house_number, Order.bus_number,
+                      OrderItem.id, OrderItem.product_id, Product.name, OrderItem.unit_price, OrderItem.quantity) \
+              .join(OrderItem, OrderItem.order_id == Order.id) \
+              .join(Product, Product.id == OrderItem.product_id)
+
+    if start:
+        query = query.where(Order.date_ordered >= start)
+    if end:
+        query = query.where(Order.date_ordered < end)
+    if complete is not None:
+        query = query.where(Order.complete == complete)
+
+    query = query.order_by(Order.id, OrderItem.id).execution_options(yield_per=batch_size)
+    for partition in db.session.execute(query).partitions():
+        yield partition
+
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # the header goes out before the first query so the download starts right away
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for partition in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in partition:
+            writer.writerow(['' if value is None else value.isoformat() if hasattr(value, 'isoformat') else value
+                             for value in row])
+        yield buffer.getvalue()
+
+
+def export_ndjson(rows):
+    for partition in rows:
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=lambda value: value.isoformat()) + '\n'
+                      for row in partition)
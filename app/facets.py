@@ -0,0 +1,79 @@
+from app import db
+from app.cache import page_cache
+from app.models import Product, Category
+from datetime import datetime, timedelta
+import sqlalchemy as sa
+
+BROWSE_PER_PAGE = 12
+# (lowest price, highest price) per band, the last band has no upper limit
+PRICE_BANDS = ((0, 10), (10, 25), (25, 50), (50, 100), (100, None))
+NEW_WITHIN_DAYS = (7, 30, 90)
+
+
+def price_band_label(band):
+    low, high = PRICE_BANDS[band]
+    return f'€{low} - €{high}' if high is not None else f'€{low}+'
+
+
+# number of products per (category, price band, age bucket), counted in one grouped query.
+# age bucket i means added within NEW_WITHIN_DAYS[i] days, the last bucket is everything older.
+# a few hundred numbers at most, so every facet count can be summed from it in memory
+def compute_facets():
+    now = datetime.utcnow()
+    band = sa.case(*[(Product.price < high, i) for i, (low, high) in enumerate(PRICE_BANDS) if high is not None],
+                   else_=len(PRICE_BANDS) - 1)
+    age = sa.case(*[(Product.created_at >= now - timedelta(days=days), i) for i, days in enumerate(NEW_WITHIN_DAYS)],
+                  else_=len(NEW_WITHIN_DAYS))
+    rows = db.session.query(Product.category_id, band, age, sa.func.count(Product.id)) \
+                     .group_by(Product.category_id, band, age)
+    return {
+        'categories': db.session.query(Category.id, Category.name).order_by(Category.name).all(),
+        'cells': {(category_id, band, age): count for category_id, band, age, count in rows},
+    }
+
+
+# recomputed after the catalog changes (the 'facets' group is invalidated) or when the page cache ttl runs out
+def catalog_facets():
+    return page_cache.value('facets', 'counts', compute_facets)
+
+
+# the counts for every option of one filter while the other filters stay applied
+def facet_counts(facets, category_id=None, band=None, days=None):
+    age_limit = NEW_WITHIN_DAYS.index(days) if days else None
+    categories = dict.fromkeys([category for category, name in facets['categories']], 0)
+    bands = dict.fromkeys(range(len(PRICE_BANDS)), 0)
+    ages = dict.fromkeys(NEW_WITHIN_DAYS, 0)
+    total = 0
+
+    for (cell_category, cell_band, cell_age), count in facets['cells'].items():
+        category_ok = category_id is None or cell_category == category_id
+        band_ok = band is None or cell_band == band
+        age_ok = age_limit is None or cell_age <= age_limit
+        if band_ok and age_ok and cell_category in categories:
+            categories[cell_category] += count
+        if category_ok and age_ok:
+            bands[cell_band] += count
+        if category_ok and band_ok:
+            for i, window in enumerate(NEW_WITHIN_DAYS):
+                if cell_age <= i:
+                    ages[window] += count
+        if category_ok and band_ok and age_ok:
+            total += count
+
+    return {'categories': categories, 'bands': bands, 'ages': ages, 'total': total}
+
+
+def filtered_products(category_id=None, band=None, days=None, page=1, per_page=BROWSE_PER_PAGE):
+    query = Product.query
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if band is not None:
+        low, high = PRICE_BANDS[band]
+        query = query.filter(Product.price >= low)
+        if high is not None:
+            query = query.filter(Product.price < high)
+    if days:
+        query = query.filter(Product.created_at >= datetime.utcnow() - timedelta(days=days))
+
+    return query.order_by(Product.created_at.desc(), Product.id.desc()) \
+                .paginate(page=page, per_page=per_page, error_out=False)
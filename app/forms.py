@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, IntegerField,DecimalField,SelectField
 from wtforms.validators import ValidationError, DataRequired, Email, EqualTo,NumberRange
 from wtforms.fields import DecimalField
@@ -8,6 +8,8 @@ from app import db
 from app.models import User
 from flask_login import current_user
 
+IMAGE_EXTENSIONS = ['jpg', 'png', 'jpeg']
+
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
     password = PasswordField('Password', validators=[DataRequired()])
@@ -72,9 +74,13 @@ class AddProductForm(FlaskForm):
     description = StringField('Description', validators=[DataRequired()])
     price = DecimalField('Price', validators=[DataRequired()])
     category = SelectField('Category', coerce=int, validators=[DataRequired()])
-    image = FileField('Product Image', validators=[FileAllowed(['jpg', 'png', 'jpeg'])])
+    image = FileField('Product Image', validators=[FileAllowed(IMAGE_EXTENSIONS)])
     submit = SubmitField('Submit')
 
+class ImportProductsForm(FlaskForm):
+    file = FileField('CSV or JSON file', validators=[FileRequired(), FileAllowed(['csv', 'json', 'jsonl', 'ndjson'])])
+    submit = SubmitField('Import')
+
 class AddToCartForm(FlaskForm):
     quantity = IntegerField('Quantity', default=1, validators=[DataRequired(), NumberRange(min=1, message="Quantity must be at least 1")])
     submit = SubmitField('Add to Cart')
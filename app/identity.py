@@ -0,0 +1,86 @@
+from app import app, db, login
+from app.models import User
+from app.cache import LRUCache
+from flask import session, has_request_context
+from flask_login import UserMixin
+import click
+import time
+
+# id -> (id, username, admin_rights, expires), shared by all requests in this process
+_identities = LRUCache(app.config['USER_CACHE_SIZE'])
+
+
+# what current_user is for a logged in user: the fields the templates and admin_required need,
+# the full User row is only loaded when another field is used
+class CachedUser(UserMixin):
+    def __init__(self, id, username, admin_rights):
+        self.id = id
+        self.username = username
+        self.admin_rights = admin_rights
+        self._user = None
+
+    # the real User row, use this to change the user
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+# keeps the identity in the (signed) session cookie for USER_CACHE_TTL seconds. the cookie gets the expiry of
+# the cached entry, so an identity is never older than USER_CACHE_TTL. only used for menus, admin_required
+# checks the database
+def remember_identity(user):
+    identity = (user.id, user.username, bool(user.admin_rights), time.time() + app.config['USER_CACHE_TTL'])
+    _identities.set(user.id, identity, app.config['USER_CACHE_TTL'])
+    if has_request_context():
+        session['identity'] = list(identity)
+    return identity
+
+
+# call this after changing a user, the next request loads it from the database again
+def forget_identity(user_id):
+    _identities.delete(user_id)
+    if has_request_context() and session.get('identity', [None])[0] == user_id:
+        session.pop('identity')
+
+
+@login.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    payload = session.get('identity')
+    if payload and payload[0] == user_id and payload[3] > time.time():
+        return CachedUser(*payload[:3])
+
+    identity = _identities.get(user_id)
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = remember_identity(user)
+    else:
+        session['identity'] = list(identity)
+    return CachedUser(*identity[:3])
+
+
+@app.cli.command('set-admin')
+@click.argument('username')
+@click.option('--revoke', is_flag=True, help='Take the admin rights away instead.')
+def set_admin_command(username, revoke):
+    """Give a user admin rights."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f'No user called {username}.')
+    user.admin_rights = not revoke
+    db.session.commit()
+    forget_identity(user.id)
+    click.echo(f'{username} is {"no longer" if revoke else "now"} an admin. The admin pages check this right away, '
+               f'the menu in open sessions follows within {app.config["USER_CACHE_TTL"]} seconds.')
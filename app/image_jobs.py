@@ -0,0 +1,68 @@
+from app import app, db
+from app.models import ImageJob
+from app.images import generate_derivatives
+from app.cache import page_cache
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import click
+
+# the resizing runs on these threads so an upload doesn't block the request, the storefront shows
+# the original image until the job is done
+_executor = ThreadPoolExecutor(max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='image-job')
+
+
+# adds the job to the session, the caller commits it together with the product and then calls submit_image_job
+def create_image_job(filename):
+    job = ImageJob(filename=filename, status='pending')
+    db.session.add(job)
+    return job
+
+
+def submit_image_job(job_id):
+    return _executor.submit(run_image_job, job_id)
+
+
+# rerun_running is for jobs left at 'running' by a worker that stopped halfway, see image-jobs-run
+def run_image_job(job_id, rerun_running=False):
+    with app.app_context():
+        job = db.session.get(ImageJob, job_id)
+        statuses = ('pending', 'failed', 'running') if rerun_running else ('pending', 'failed')
+        if job is None or job.status not in statuses:
+            return
+        job.status = 'running'
+        db.session.commit()
+
+        try:
+            generate_derivatives(job.filename)
+            job.status = 'done'
+            job.error = None
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+        # the cached catalog pages still point at the original image
+        if job.status == 'done':
+            page_cache.invalidate('index', 'category', 'new_items', 'popular_items', 'facets')
+
+
+@app.cli.command('image-jobs-run')
+@click.option('--retry-failed', is_flag=True, help='Also run the jobs that failed before.')
+@click.option('--stale-minutes', default=30, show_default=True,
+              help='Also run the jobs still running this long after they were created, 0 to skip them.')
+def image_jobs_run_command(retry_failed, stale_minutes):
+    """Run the image jobs that are still waiting, for example after a restart."""
+    statuses = ['pending', 'failed'] if retry_failed else ['pending']
+    waiting = ImageJob.status.in_(statuses)
+    # a worker that was killed halfway leaves its job at 'running' without a finished_at
+    if stale_minutes:
+        stale = db.and_(ImageJob.status == 'running', ImageJob.finished_at.is_(None),
+                        ImageJob.created_at < datetime.utcnow() - timedelta(minutes=stale_minutes))
+        waiting = db.or_(waiting, stale)
+    job_ids = [job.id for job in ImageJob.query.filter(waiting).order_by(ImageJob.id)]
+    for job_id in job_ids:
+        run_image_job(job_id, rerun_running=bool(stale_minutes))
+        job = db.session.get(ImageJob, job_id)
+        db.session.refresh(job)
+        click.echo(f'{job.filename}: {job.status}')
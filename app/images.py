@@ -0,0 +1,119 @@
+from app import app
+from concurrent.futures import ProcessPoolExecutor
+from markupsafe import Markup, escape
+from app.assets import static_url
+from PIL import Image, ImageOps, ExifTags, features
+import click
+import os
+
+# the widths (in pixels) the product images are resized to
+IMAGE_WIDTHS = (320, 640, 1024)
+DERIVATIVE_FOLDER = 'derivatives'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# modern formats first, the browser takes the first <source> it supports; jpg is the fallback for the <img> itself
+IMAGE_FORMATS = [('avif', 'AVIF', 'image/avif'), ('webp', 'WEBP', 'image/webp')]
+IMAGE_FORMATS = [image_format for image_format in IMAGE_FORMATS if features.check(image_format[0])]
+
+_available = {}
+
+
+def derivative_name(filename, width, extension):
+    stem = os.path.splitext(filename)[0]
+    return f'{DERIVATIVE_FOLDER}/{stem}-{width}.{extension}'
+
+
+def derivative_widths(width):
+    # never upscale, an image smaller than the smallest width only gets its own width
+    return [w for w in IMAGE_WIDTHS if w < width] or [width]
+
+
+# writes every width in every format next to the original, returns the widths that were made
+def generate_derivatives(filename, folder=None):
+    folder = folder or app.config['UPLOAD_FOLDER']
+    os.makedirs(os.path.join(folder, DERIVATIVE_FOLDER), exist_ok=True)
+
+    with Image.open(os.path.join(folder, filename)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        widths = derivative_widths(image.width)
+
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            for extension, pil_format, mime_type in IMAGE_FORMATS:
+                resized.save(os.path.join(folder, derivative_name(filename, width, extension)), pil_format, quality=75)
+            resized.convert('RGB').save(os.path.join(folder, derivative_name(filename, width, 'jpg')), 'JPEG',
+                                        quality=80, optimize=True, progressive=True)
+
+    _available.pop(filename, None)
+    return widths
+
+
+# the width generate_derivatives works with, after the exif rotation, read from the header without decoding the image
+def display_width(path):
+    with Image.open(path) as image:
+        rotated = image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8)
+        return image.height if rotated else image.width
+
+
+# the widths that are on disk for this image, an empty list until the derivatives are made
+def available_widths(filename):
+    if filename in _available:
+        return _available[filename]
+    folder = app.config['UPLOAD_FOLDER']
+    widths = [w for w in IMAGE_WIDTHS
+              if os.path.exists(os.path.join(folder, derivative_name(filename, w, 'jpg')))]
+    if not widths:
+        # an image narrower than every IMAGE_WIDTHS only got a copy at its own width
+        try:
+            width = display_width(os.path.join(folder, filename))
+        except OSError:
+            width = None
+        if width and width <= IMAGE_WIDTHS[0] \
+                and os.path.exists(os.path.join(folder, derivative_name(filename, width, 'jpg'))):
+            widths = [width]
+    if widths:
+        _available[filename] = widths
+    return widths
+
+
+# <picture> with a srcset per format, falls back to the original file when there are no derivatives yet
+@app.template_global()
+def product_image(filename, alt, css_class='', sizes='(min-width: 992px) 25vw, (min-width: 768px) 33vw, 100vw'):
+    original = static_url('assets/images/' + filename)
+    attributes = f' class="{escape(css_class)}"' if css_class else ''
+    widths = available_widths(filename)
+    if not widths:
+        return Markup(f'<img src="{escape(original)}" alt="{escape(alt)}"{attributes} loading="lazy">')
+
+    def srcset(extension):
+        return ', '.join(static_url('assets/images/' + derivative_name(filename, w, extension)) + f' {w}w'
+                         for w in widths)
+
+    sources = ''.join(f'<source type="{mime_type}" srcset="{escape(srcset(extension))}" sizes="{escape(sizes)}">'
+                      for extension, pil_format, mime_type in IMAGE_FORMATS)
+    return Markup(f'<picture>{sources}<img src="{escape(original)}" srcset="{escape(srcset("jpg"))}" '
+                  f'sizes="{escape(sizes)}" alt="{escape(alt)}"{attributes} loading="lazy"></picture>')
+
+
+def _backfill_one(args):
+    filename, folder = args
+    try:
+        return filename, generate_derivatives(filename, folder), None
+    except Exception as e:
+        return filename, None, str(e)
+
+
+@app.cli.command('images-backfill')
+@click.option('--workers', default=None, type=int, help='Number of worker processes, defaults to the CPU count.')
+def images_backfill_command(workers):
+    """Generate the resized images for every existing product image."""
+    folder = os.path.abspath(app.config['UPLOAD_FOLDER'])
+    filenames = [name for name in sorted(os.listdir(folder)) if name.lower().endswith(IMAGE_EXTENSIONS)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for filename, widths, error in pool.map(_backfill_one, [(name, folder) for name in filenames]):
+            if error:
+                click.echo(f'{filename}: failed ({error})')
+            else:
+                click.echo(f'{filename}: {", ".join(str(w) for w in widths)}')
@@ -0,0 +1,68 @@
+from app import db
+from app.models import Order
+from datetime import datetime
+import sqlalchemy as sa
+
+
+# a page of orders found by seeking on (date_ordered, id) instead of COUNT(*) + OFFSET,
+# so every page costs the same no matter how deep it is
+class KeysetPage:
+    def __init__(self, items, has_prev, has_next):
+        self.items = items
+        self.has_prev = has_prev
+        self.has_next = has_next
+
+    @property
+    def prev_cursor(self):
+        return make_cursor(self.items[0]) if self.has_prev and self.items else None
+
+    @property
+    def next_cursor(self):
+        return make_cursor(self.items[-1]) if self.has_next and self.items else None
+
+
+def make_cursor(order):
+    return f'{order.date_ordered.isoformat()}_{order.id}'
+
+
+# returns (date_ordered, id) or None for a missing or broken cursor
+def parse_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        date_ordered, order_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(date_ordered), int(order_id)
+    except ValueError:
+        return None
+
+
+# newest orders first, after is the cursor of the last order on the current page, before the one of the first
+def paginate_orders(query, after=None, before=None, per_page=5):
+    key = sa.tuple_(Order.date_ordered, Order.id)
+    after = parse_cursor(after)
+    before = parse_cursor(before)
+
+    if before:
+        items = query.filter(key > sa.tuple_(*before)) \
+                     .order_by(Order.date_ordered.asc(), Order.id.asc()) \
+                     .limit(per_page + 1) \
+                     .all()
+        has_prev = len(items) > per_page
+        items = list(reversed(items[:per_page]))
+        return KeysetPage(items, has_prev=has_prev, has_next=True)
+
+    if after:
+        query = query.filter(key < sa.tuple_(*after))
+    items = query.order_by(Order.date_ordered.desc(), Order.id.desc()) \
+                 .limit(per_page + 1) \
+                 .all()
+    return KeysetPage(items[:per_page], has_prev=after is not None, has_next=len(items) > per_page)
+
+
+# the planner's row estimate on postgres, cheap but not exact; other databases fall back to COUNT(*)
+def estimate_order_count():
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.scalar(sa.text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'order'"))
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return db.session.scalar(sa.select(sa.func.count(Order.id)))
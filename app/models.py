@@ -1,7 +1,9 @@
 from datetime import datetime
+from flask import current_app
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from app import db, login
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from app import db
 
 
 class User(UserMixin, db.Model):
@@ -20,20 +22,16 @@ class User(UserMixin, db.Model):
         return f'<User {self.username}>'
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
 
-@login.user_loader
-def load_user(id):
-    return User.query.get(int(id))
-
-
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False, unique=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     products = db.relationship('Product', backref='category', lazy='dynamic')
 
 
@@ -42,10 +40,14 @@ class Product(db.Model):
     name = db.Column(db.String(128), nullable=False)
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.Float, nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False, index=True)
     image_filename = db.Column(db.String(255))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # kept up to date by a trigger on postgres, sqlite uses the product_search fts5 table instead (see app/search.py)
+    search_vector = db.deferred(db.Column(TSVECTOR().with_variant(db.Text(), 'sqlite')))
 
+    __table_args__ = (db.Index('ix_product_search_vector', 'search_vector', postgresql_using='gin'),)
 
     def __repr__(self):
         return f'<Product {self.name}>'
@@ -58,6 +60,9 @@ class CartItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False, default=1)
     product = db.relationship('Product', backref='cart_items')
 
+    # one row per product in a cart, this also serves as the index for looking up a user's cart
+    __table_args__ = (db.UniqueConstraint('user_id', 'product_id', name='uq_cart_item_user_product'),)
+
     def __repr__(self):
         return f'<CartItem {self.id} - User: {self.user_id}, Product: {self.product_id}, Quantity: {self.quantity}>'
 
@@ -72,7 +77,10 @@ class Order(db.Model):
     postal_number = db.Column(db.String(20), nullable=False)
     house_number = db.Column(db.String(20), nullable=False)
     bus_number = db.Column(db.String(20))
-    complete = db.Column(db.Boolean, default=False)
+    complete = db.Column(db.Boolean, default=False, index=True)
+
+    # the orders list seeks on (date_ordered, id)
+    __table_args__ = (db.Index('ix_order_date_ordered_id', 'date_ordered', 'id'),)
 
     def __repr__(self):
         return f'<Order {self.id} by User {self.user_id}, Total Price: {self.total_price}>'
@@ -80,10 +88,39 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
+    # the price paid, Product.price can change after the order
+    unit_price = db.Column(db.Float, nullable=False)
     product = db.relationship('Product', backref='order_items')
 
     def __repr__(self):
         return f'<OrderItem {self.id} - Order: {self.order_id}, Product: {self.product_id}, Quantity: {self.quantity}>'
+
+
+# daily sales per product, kept up to date by place_order so the statistics don't have to scan every OrderItem
+class ProductSalesDay(db.Model):
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    basket_share_total = db.Column(db.Float, nullable=False, default=0)
+    product = db.relationship('Product', backref='sales_days')
+
+    def __repr__(self):
+        return f'<ProductSalesDay Product: {self.product_id}, Day: {self.day}, Units: {self.units_sold}>'
+
+
+# resizing of an uploaded product image, done off the request by the workers in app/image_jobs.py
+class ImageJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ImageJob {self.id} {self.filename}: {self.status}>'
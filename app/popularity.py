@@ -0,0 +1,69 @@
+from app import app, db
+from app.cache import page_cache
+from app.models import Product, ProductSalesDay
+from collections import namedtuple
+from datetime import datetime, timedelta
+import sqlalchemy as sa
+import threading
+import time
+
+# the columns the product cards need, so the cached ranking doesn't hold on to database objects
+PopularProduct = namedtuple('PopularProduct', ['id', 'name', 'description', 'price', 'image_filename'])
+
+POPULAR_WINDOWS = (7, 30)
+
+_rankings = {}
+_lock = threading.Lock()
+
+
+# score per product, recent days count more when a half life is set
+def compute_ranking(top_n, days=None, half_life=None):
+    query = db.session.query(ProductSalesDay.product_id, ProductSalesDay.day, ProductSalesDay.order_count)
+    if days:
+        query = query.filter(ProductSalesDay.day >= (datetime.utcnow() - timedelta(days=days)).date())
+
+    if half_life:
+        today = datetime.utcnow().date()
+        scores = {}
+        for product_id, day, order_count in query:
+            age = (today - day).days
+            scores[product_id] = scores.get(product_id, 0) + order_count * 0.5 ** (age / half_life)
+    else:
+        scores = dict(query.with_entities(ProductSalesDay.product_id, sa.func.sum(ProductSalesDay.order_count))
+                           .group_by(ProductSalesDay.product_id))
+
+    top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_n]
+    products = {p.id: p for p in Product.query.filter(Product.id.in_([product_id for product_id, score in top]))}
+    ranking = []
+    for product_id, score in top:
+        product = products.get(product_id)
+        if product:
+            snapshot = PopularProduct(product.id, product.name, product.description, product.price, product.image_filename)
+            ranking.append((snapshot, round(score)))
+    return ranking
+
+
+# the ranking is computed at most once per ttl and per window, every other view is served from memory
+def popular_products(limit=4, days=None):
+    now = time.monotonic()
+    cached = _rankings.get(days)
+    if cached and cached[0] > now:
+        return cached[1][:limit]
+
+    with _lock:
+        cached = _rankings.get(days)
+        if cached and cached[0] > now:
+            return cached[1][:limit]
+        top_n = max(limit, app.config['POPULAR_ITEMS_TOP_N'])
+        ranking = compute_ranking(top_n, days, app.config['POPULAR_ITEMS_HALF_LIFE'])
+        # the cached pages show the old ranking, they would otherwise stay until PAGE_CACHE_TTL
+        if cached and cached[1] != ranking:
+            page_cache.invalidate('popular_items')
+        _rankings[days] = (now + app.config['POPULAR_ITEMS_TTL'], ranking)
+    return ranking[:limit]
+
+
+# drops the cached rankings so the next view recomputes them
+def refresh_popular_products():
+    with _lock:
+        _rankings.clear()
@@ -0,0 +1,103 @@
+from app import app
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+slow_query_log = logging.getLogger('app.slow_queries')
+
+APP_FOLDER = os.path.dirname(os.path.abspath(__file__))
+# frames in these files are the profiler itself or plumbing, the call site is the first frame after them
+SKIPPED_FILES = (os.path.join(APP_FOLDER, 'profiler.py'), os.path.join(APP_FOLDER, 'database.py'))
+
+# endpoint -> totals over every request since the process started, shown on /sql_profile
+_routes = {}
+_lock = threading.Lock()
+
+
+# the innermost line of our own code (a view, a template helper, ...) that caused the query
+def call_site():
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_FOLDER) and filename not in SKIPPED_FILES:
+            return f'{os.path.relpath(filename, os.path.dirname(APP_FOLDER))}:{frame.f_lineno} in {frame.f_code.co_name}'
+        if filename.endswith('.html'):
+            return f'template {os.path.basename(filename)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def end_query(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    if not app.config['SQL_PROFILER'] or not has_request_context():
+        return
+
+    profile = g.setdefault('sql_profile', {'count': 0, 'time': 0.0, 'slowest': []})
+    profile['count'] += 1
+    profile['time'] += duration
+
+    slowest = profile['slowest']
+    top = app.config['SQL_PROFILER_TOP']
+    is_slow = duration * 1000 >= app.config['SLOW_QUERY_MS']
+    # the call site is only looked up for the queries we keep, walking the stack for every query costs too much
+    if is_slow or len(slowest) < top or duration > slowest[-1]['duration']:
+        query = {'duration': duration, 'statement': statement, 'call_site': call_site()}
+        slowest.append(query)
+        slowest.sort(key=lambda q: q['duration'], reverse=True)
+        del slowest[top:]
+
+        if is_slow:
+            slow_query_log.warning(json.dumps({
+                'event': 'slow_query',
+                'endpoint': request.endpoint,
+                'path': request.path,
+                'duration_ms': round(duration * 1000, 2),
+                'call_site': query['call_site'],
+                'statement': statement,
+            }))
+
+
+@app.after_request
+def add_server_timing(response):
+    profile = g.get('sql_profile')
+    if profile is None:
+        return response
+    response.headers.add('Server-Timing', f'db;dur={profile["time"] * 1000:.2f};desc="{profile["count"]} queries"')
+
+    with _lock:
+        route = _routes.setdefault(request.endpoint or 'unknown', {
+            'endpoint': request.endpoint or 'unknown', 'requests': 0, 'queries': 0, 'max_queries': 0,
+            'time': 0.0, 'max_time': 0.0, 'slowest': []})
+        route['requests'] += 1
+        route['queries'] += profile['count']
+        route['max_queries'] = max(route['max_queries'], profile['count'])
+        route['time'] += profile['time']
+        route['max_time'] = max(route['max_time'], profile['time'])
+        route['slowest'] = sorted(route['slowest'] + profile['slowest'],
+                                  key=lambda q: q['duration'], reverse=True)[:app.config['SQL_PROFILER_TOP']]
+    return response
+
+
+# the routes that spend the most time in the database per request first
+def worst_routes():
+    with _lock:
+        routes = [dict(route, avg_queries=route['queries'] / route['requests'],
+                       avg_time=route['time'] / route['requests']) for route in _routes.values()]
+    return sorted(routes, key=lambda route: route['avg_time'], reverse=True)
+
+
+def reset_profile():
+    with _lock:
+        _routes.clear()
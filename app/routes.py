@@ -1,15 +1,33 @@
-from flask import render_template, flash, redirect, url_for, request
+from flask import render_template, flash, redirect, url_for, request, jsonify, Response, stream_with_context, abort
 from functools import wraps
-from app import app, db
-from app.forms import LoginForm, RegistrationForm, EditProfileForm, AddCategoryForm, AddProductForm, ResetPasswordForm, AddToCartForm
-from flask_login import current_user, login_user, logout_user, login_required, LoginManager
+from app import app, db, login as login_manager
+from app.forms import LoginForm, RegistrationForm, EditProfileForm, AddCategoryForm, AddProductForm, ResetPasswordForm, AddToCartForm, ImportProductsForm
+from flask_login import current_user, login_user, logout_user, login_required
 import sqlalchemy as sa
-from app.models import User, Product, Category, CartItem, Order, OrderItem
+from app.models import User, Product, Category, CartItem, Order, OrderItem, ImageJob
+from app.stats import product_statistics, record_sales
+from app.cart import get_cart_items, get_cart_total, get_order_items, add_cart_items
+from app.cache import page_cache
+from app.image_jobs import create_image_job, submit_image_job
+from app.assets import save_upload
+from app.security import login_allowed, verify_password, password_needs_rehash, rehash_password
+from app.identity import remember_identity, forget_identity
+from app.database import replica_reads, replica_stream, pool_metrics
+from app.search import search_products
+from app.export import export_rows, export_csv, export_ndjson
+from app.facets import catalog_facets, facet_counts, filtered_products, price_band_label, PRICE_BANDS, NEW_WITHIN_DAYS
+from app.suggest import suggest, suggestions, local_catalog_change
+from app.bulk_import import import_products, read_records
+from app.profiler import worst_routes, reset_profile
+from app.conditional import conditional, catalog_version, product_version
+from app.keyset import paginate_orders, estimate_order_count
+from app.catalog import products_per_category, category_counts, category_products, PRODUCTS_PER_CATEGORY
+from app.popularity import popular_products, refresh_popular_products, POPULAR_WINDOWS
 from urllib.parse import urlsplit
 from werkzeug.utils import secure_filename
-from werkzeug.security import check_password_hash, generate_password_hash
-import os
+import io
 from sqlalchemy import func
+from datetime import datetime, timedelta
 
 
 UPLOAD_FOLDER = 'app/static/assets/images'
@@ -18,30 +36,97 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-login_manager = LoginManager()
-login_manager.init_app(app)
-
 # function for admin required
 def admin_required(func):
     @wraps(func)
     def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not current_user.admin_rights:
-            return redirect(url_for('error_page'))
+        # the cached identity is only good enough for the menu, admin pages check the user row itself
+        # so revoked rights take effect right away (one primary key lookup)
+        user = db.session.get(User, current_user.id) if current_user.is_authenticated else None
+        if user is None or not user.admin_rights:
+            abort(403)
         return func(*args, **kwargs)
     return decorated_function
 
-# load user function 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
 # the first page you wil come to if you are searching the website (/)
 @app.route('/')
 @app.route('/index')
+@replica_reads
+@conditional(catalog_version)
+@page_cache.cached('index')
 def index():
-    categories = Category.query.all()
-    products = Product.query.all()
-    return render_template('index.html', categories=categories, products=products)
+    categories = Category.query.order_by(Category.id).all()
+    products = products_per_category(PRODUCTS_PER_CATEGORY)
+    counts = category_counts()
+    return render_template('index.html', categories=categories, products=products, counts=counts,
+                           per_category=PRODUCTS_PER_CATEGORY)
+
+# all products of one category, a page at a time
+@app.route('/category/<int:category_id>')
+@replica_reads
+@page_cache.cached('category')
+def category(category_id):
+    category = Category.query.get_or_404(category_id)
+    page = request.args.get('page', 1, type=int)
+    products = category_products(category_id, page=page)
+
+    prev_page = url_for('category', category_id=category_id, page=products.prev_num) if products.has_prev else None
+    next_page = url_for('category', category_id=category_id, page=products.next_num) if products.has_next else None
+
+    return render_template('category.html', category=category, products=products,
+                           prev_page=prev_page, next_page=next_page)
+
+# all products with filters on category, price and newness, with the number of products behind every filter
+@app.route('/browse')
+@replica_reads
+@page_cache.cached('facets')
+def browse():
+    category_id = request.args.get('category', type=int)
+    band = request.args.get('price', type=int)
+    days = request.args.get('days', type=int)
+    page = request.args.get('page', 1, type=int)
+    if band not in range(len(PRICE_BANDS)):
+        band = None
+    if days not in NEW_WITHIN_DAYS:
+        days = None
+
+    facets = catalog_facets()
+    counts = facet_counts(facets, category_id, band, days)
+    products = filtered_products(category_id, band, days, page=page)
+
+    filters = {'category': category_id, 'price': band, 'days': days}
+    def filter_url(**changes):
+        args = {name: value for name, value in dict(filters, **changes).items() if value is not None}
+        return url_for('browse', **args)
+
+    return render_template('browse.html', products=products, filters=filters, counts=counts,
+                           categories=facets['categories'], price_bands=range(len(PRICE_BANDS)),
+                           price_band_label=price_band_label, new_within_days=NEW_WITHIN_DAYS,
+                           filter_url=filter_url,
+                           prev_page=filter_url(page=products.prev_num) if products.has_prev else None,
+                           next_page=filter_url(page=products.next_num) if products.has_next else None)
+
+# full-text search over the product name, description and category
+@app.route('/search')
+@replica_reads
+def search():
+    q = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    products = search_products(q, page=page)
+
+    prev_page = url_for('search', q=q, page=products.prev_num) if products and products.has_prev else None
+    next_page = url_for('search', q=q, page=products.next_num) if products and products.has_next else None
+
+    return render_template('search.html', q=q, products=products,
+                           prev_page=prev_page, next_page=next_page)
+
+# typeahead for the search box, answered from memory without touching the database
+@app.route('/suggest')
+def suggest_names():
+    results = [{'type': kind, 'id': item_id, 'name': name,
+                'url': url_for('product', product_id=item_id) if kind == 'product' else url_for('category', category_id=item_id)}
+               for kind, item_id, name in suggest(request.args.get('q', ''))]
+    return jsonify(suggestions=results)
 
 if __name__=='__main__':
     app.run(debug=True)
@@ -53,12 +138,24 @@ def login():
         return redirect(url_for('index'))
     form = LoginForm()
     if form.validate_on_submit():
+        # behind a reverse proxy remote_addr is only the client's address when PROXY_FIX_HOPS is set
+        if not login_allowed(request.remote_addr, form.username.data):
+            flash('Too many login attempts, please wait a minute and try again.')
+            return redirect(url_for('login'))
         user = db.session.scalar(
             sa.select(User).where(User.username == form.username.data))
-        if user is None or not user.check_password(form.password.data):
+        valid = verify_password(user, form.password.data) if user is not None else False
+        if valid is None:
+            flash('The server is busy, please try again.')
+            return redirect(url_for('login'))
+        if not valid:
             flash('Invalid username or password')
             return redirect(url_for('login'))
+        # the hash settings changed since this password was set, this is the only moment we know the password
+        if password_needs_rehash(user) and rehash_password(user, form.password.data):
+            db.session.commit()
         login_user(user, remember=form.remember_me.data)
+        remember_identity(user)
         next_page = request.args.get('next')
         if not next_page or urlsplit(next_page).netloc != '':
             next_page = url_for('index')
@@ -67,6 +164,8 @@ def login():
 
 @app.route('/logout')
 def logout():
+    if current_user.is_authenticated:
+        forget_identity(current_user.id)
     logout_user()
     return redirect(url_for('index'))
 
@@ -106,14 +205,16 @@ def edit_profile():
 
     if form.validate_on_submit():
         try:
-            current_user.email = form.email.data
-            current_user.country = form.country.data
-            current_user.street = form.street.data
-            current_user.postal_number = form.postal_number.data
-            current_user.house_number = form.house_number.data
-            current_user.bus_number = form.bus_number.data
+            user = current_user.user
+            user.email = form.email.data
+            user.country = form.country.data
+            user.street = form.street.data
+            user.postal_number = form.postal_number.data
+            user.house_number = form.house_number.data
+            user.bus_number = form.bus_number.data
 
             db.session.commit() 
+            forget_identity(user.id)
 
             flash('Your changes have been saved.')
             return redirect(url_for('index'))
@@ -138,10 +239,10 @@ def edit_profile():
 def reset_password():
     form = ResetPasswordForm()
     if form.validate_on_submit():
-        if check_password_hash(current_user.password_hash, form.old_password.data):
-            new_password_hash = generate_password_hash(form.new_password.data)
-            current_user.password_hash = new_password_hash
+        if current_user.user.check_password(form.old_password.data):
+            current_user.user.set_password(form.new_password.data)
             db.session.commit()
+            forget_identity(current_user.id)
             flash('Your password has been reset successfully!', 'success')
             return redirect(url_for('index'))
         else:
@@ -164,6 +265,9 @@ def manage_shop_data():
                 category = Category(name=category_form.name.data)
                 db.session.add(category)
                 db.session.commit()
+                with local_catalog_change():
+                    suggestions.add('category', category.id, category.name)
+                    page_cache.invalidate('index', 'category', 'facets')
                 flash('Category added successfully!')
                 return redirect(url_for('manage_shop_data'))
 
@@ -171,10 +275,13 @@ def manage_shop_data():
             if product_form.validate_on_submit():
                 image_file = request.files['image']
                 if image_file:
-                    filename = secure_filename(image_file.filename)
-                    image_file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                    filename, is_new = save_upload(image_file, app.config['UPLOAD_FOLDER'],
+                                                   secure_filename(image_file.filename))
+                    # an image that was uploaded before already has its resized versions
+                    image_job = create_image_job(filename) if is_new else None
                 else:
                     filename = 'default_product_image.jpg'
+                    image_job = None
 
                 product = Product(
                     name=product_form.name.data,
@@ -185,7 +292,15 @@ def manage_shop_data():
                 )
                 db.session.add(product)
                 db.session.commit()
-                flash('Product added successfully!')
+                # a new product has no sales yet so the popular items stay the same
+                with local_catalog_change():
+                    suggestions.add('product', product.id, product.name)
+                    page_cache.invalidate('index', 'category', 'new_items', 'facets')
+                if image_job:
+                    submit_image_job(image_job.id)
+                    flash(f'Product added successfully! The image is being processed (job {image_job.id}).')
+                else:
+                    flash('Product added successfully!')
                 return redirect(url_for('manage_shop_data'))
 
         if 'delete_category' in request.form:
@@ -194,6 +309,9 @@ def manage_shop_data():
                 category = Category.query.get_or_404(category_id)
                 db.session.delete(category)
                 db.session.commit()
+                with local_catalog_change():
+                    suggestions.remove('category', category.id)
+                    page_cache.invalidate('index', 'category', 'new_items', 'popular_items', 'facets')
                 flash('Category deleted successfully!')
                 return redirect(url_for('manage_shop_data'))
 
@@ -203,6 +321,10 @@ def manage_shop_data():
                 product = Product.query.get_or_404(product_id)
                 db.session.delete(product)
                 db.session.commit()
+                refresh_popular_products()
+                with local_catalog_change():
+                    suggestions.remove('product', product.id)
+                    page_cache.invalidate('index', 'category', 'new_items', 'popular_items', 'facets')
                 flash('Product deleted successfully!')
                 return redirect(url_for('manage_shop_data'))
 
@@ -213,8 +335,34 @@ def manage_shop_data():
                            product_form=product_form, category_form=category_form, 
                            categories=categories, products=products)
 
+#adds many products at once from a csv or json file, the categories they name are created when missing
+@app.route('/import_products', methods=['GET', 'POST'])
+@admin_required
+def import_products_view():
+    form = ImportProductsForm()
+    result = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        result = import_products(read_records(stream, upload.filename))
+        for job_id in result['image_jobs']:
+            submit_image_job(job_id)
+        flash(f'Imported {result["imported"]} products, created {result["categories_created"]} categories.')
+    return render_template('import_products.html', title='Import Products', form=form, result=result)
+
+#the status of an image job, so the admin can see when the resized images are ready
+@app.route('/image_job/<int:job_id>')
+@admin_required
+def image_job_status(job_id):
+    job = ImageJob.query.get_or_404(job_id)
+    return jsonify(id=job.id, filename=job.filename, status=job.status, error=job.error,
+                   created_at=job.created_at.isoformat() if job.created_at else None,
+                   finished_at=job.finished_at.isoformat() if job.finished_at else None)
+
 #this is to display individual products
 @app.route('/product/<int:product_id>')
+@replica_reads
+@conditional(product_version)
 def product(product_id):
     product = Product.query.get_or_404(product_id)
     form = AddToCartForm()
@@ -231,13 +379,7 @@ def add_to_cart(product_id):
     form = AddToCartForm()
     if form.validate_on_submit():
         if current_user.is_authenticated:
-            quantity = form.quantity.data
-            cart_item = CartItem.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-            if cart_item:
-                cart_item.quantity += quantity
-            else:
-                cart_item = CartItem(user_id=current_user.id, product_id=product_id, quantity=quantity)
-                db.session.add(cart_item)
+            add_cart_items(current_user.id, {product_id: form.quantity.data})
             db.session.commit()
             flash('Item added to cart successfully!', 'success')
             return redirect(url_for('index'))
@@ -250,12 +392,34 @@ def add_to_cart(product_id):
 
     return redirect(url_for('product', product_id=product_id))
 
+#this is to add several products at once, the form sends a quantity_<product_id> field per product
+@app.route('/add_to_cart_batch', methods=['POST'])
+@login_required
+def add_to_cart_batch():
+    quantities = {}
+    for field in request.form:
+        product_id = field[len('quantity_'):]
+        quantity = request.form.get(field, type=int)
+        if field.startswith('quantity_') and product_id.isdigit() and quantity and quantity > 0:
+            quantities[int(product_id)] = quantity
+
+    existing = set(db.session.scalars(sa.select(Product.id).where(Product.id.in_(quantities))))
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if product_id in existing}
+    if not quantities:
+        flash('No valid products to add to the cart.', 'error')
+        return redirect(request.referrer or url_for('index'))
+
+    add_cart_items(current_user.id, quantities)
+    db.session.commit()
+    flash(f'{len(quantities)} items added to cart successfully!', 'success')
+    return redirect(url_for('view_cart'))
+
 #this is to everything for viewing/deleting items in the cart 
 @app.route('/cart')
 @login_required
 def view_cart():
-    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
-    total_price = sum(item.product.price * item.quantity for item in cart_items)
+    cart_items = get_cart_items(current_user.id)
+    total_price = get_cart_total(current_user.id)
     total_price_formatted = "{:.2f}".format(total_price)
     return render_template('cart.html', cart_items=cart_items, total_price=total_price_formatted)
 
@@ -294,8 +458,8 @@ def update_cart(cart_item_id):
 @app.route('/checkout', methods=['GET'])
 @login_required
 def checkout():
-    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
-    total_price = sum(item.product.price * item.quantity for item in cart_items)
+    cart_items = get_cart_items(current_user.id)
+    total_price = get_cart_total(current_user.id)
     total_price_formatted = "{:.2f}".format(total_price)
     return render_template('checkout.html', cart_items=cart_items, total_price=total_price_formatted)
 
@@ -303,8 +467,10 @@ def checkout():
 @app.route('/place_order', methods=['POST'])
 @login_required
 def place_order():
-    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
+    # the cart rows stay locked until the commit, so a second checkout waits and then finds an empty cart
+    cart_items = get_cart_items(current_user.id, lock=True)
     if not cart_items:
+        db.session.rollback()
         flash('Your cart is empty.', 'error')
         return redirect(url_for('index'))
     
@@ -333,54 +499,105 @@ def place_order():
     if alt_bus_number:
         bus_number = alt_bus_number
     
-    total_price = sum(item.product.price * item.quantity for item in cart_items)
-    
-    order = Order(
-        user_id=current_user.id,
-        total_price=total_price,
-        country=country,
-        street=street,
-        postal_number=postal_number,
-        house_number=house_number,
-        bus_number=bus_number
-    )
-    db.session.add(order)
-    db.session.commit()
-    
-    for item in cart_items:
-        order_item = OrderItem(order_id=order.id, product_id=item.product.id, quantity=item.quantity)
-        db.session.add(order_item)
-        db.session.delete(item)
-    
-    db.session.commit()
-    
+    # one snapshot of the prices so the order total and the sales always match
+    prices = {item.product_id: item.product.price for item in cart_items}
+    total_price = sum(prices[item.product_id] * item.quantity for item in cart_items)
+
+    try:
+        order = Order(
+            user_id=current_user.id,
+            total_price=total_price,
+            country=country,
+            street=street,
+            postal_number=postal_number,
+            house_number=house_number,
+            bus_number=bus_number
+        )
+        db.session.add(order)
+        db.session.flush()
+
+        db.session.execute(sa.insert(OrderItem), [
+            dict(order_id=order.id, product_id=item.product_id, quantity=item.quantity,
+                 unit_price=prices[item.product_id])
+            for item in cart_items
+        ])
+        deleted = CartItem.query.filter(CartItem.id.in_([item.id for item in cart_items])) \
+                                .delete(synchronize_session=False)
+        # FOR UPDATE does nothing on sqlite, the delete tells us when a parallel checkout already took the cart
+        if deleted != len(cart_items):
+            db.session.rollback()
+            flash('Your cart changed while placing the order, please check it and try again.', 'error')
+            return redirect(url_for('view_cart'))
+
+        # the sales rollup is updated in the same transaction as the order items
+        record_sales(order, [(item.product_id, item.quantity, prices[item.product_id]) for item in cart_items])
+        db.session.commit()
+
+    except Exception:
+        db.session.rollback()
+        # the exception holds the sql and its parameters, that goes to the log and not to the customer
+        app.logger.exception('placing an order for user %s failed', current_user.id)
+        flash('Something went wrong while placing your order, please try again.', 'error')
+        return redirect(url_for('checkout'))
+
+    if app.config['POPULAR_ITEMS_REFRESH_ON_ORDER']:
+        refresh_popular_products()
+        page_cache.invalidate('popular_items')
+
     flash('Your order has been placed successfully!', 'success')
     return redirect(url_for('index'))
 
 #here would be the place to place the payment function 
 
+#the database connection pool numbers, to see if the pool is big enough
+@app.route('/db_pool')
+@admin_required
+def db_pool():
+    return jsonify({bind or 'default': pool_metrics(engine) for bind, engine in db.engines.items()})
+
+#the routes that spend the most time in the database
+@app.route('/sql_profile', methods=['GET', 'POST'])
+@admin_required
+def sql_profile():
+    if request.method == 'POST':
+        reset_profile()
+        return redirect(url_for('sql_profile'))
+    return render_template('sql_profile.html', routes=worst_routes())
+
 #the statistics function
 @app.route('/statistics')
+@replica_reads
 @admin_required
 def statistics():
-    products = Product.query.all()
-    product_stats = []
+    page = request.args.get('page', 1, type=int)
+    category_id = request.args.get('category', type=int)
+    start_date = request.args.get('start', '')
+    end_date = request.args.get('end', '')
 
-    for product in products:
-        total_sold = db.session.query(db.func.sum(OrderItem.quantity)).filter_by(product_id=product.id).scalar() or 0
-        product_stats.append({
-            'name': product.name,
-            'total_sold': total_sold
-        })
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        # the end date is inclusive so we filter up to the start of the next day
+        end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+    except ValueError:
+        flash('Please enter dates as YYYY-MM-DD.', 'error')
+        return redirect(url_for('statistics'))
 
-    return render_template('statistics.html', products=product_stats)
+    product_stats = product_statistics(start=start, end=end, category_id=category_id, page=page)
+    categories = Category.query.order_by(Category.name).all()
+
+    filters = dict(category=category_id, start=start_date, end=end_date)
+    prev_page = url_for('statistics', page=product_stats.prev_num, **filters) if product_stats.has_prev else None
+    next_page = url_for('statistics', page=product_stats.next_num, **filters) if product_stats.has_next else None
+
+    return render_template('statistics.html', products=product_stats, categories=categories,
+                           category_id=category_id, start_date=start_date, end_date=end_date,
+                           prev_page=prev_page, next_page=next_page)
 
 #here you can check all of your orders 
 @app.route('/orders', methods=['GET'])
 @admin_required
 def orders():
     status = request.args.get('status', 'all')
-    page = request.args.get('page', 1, type=int)
     per_page = 5
     search_term = request.args.get('search', '')
 
@@ -398,19 +615,53 @@ def orders():
             flash('Please enter a valid order ID for search.', 'error')
             return redirect(url_for('orders'))
 
-    orders = query.order_by(Order.date_ordered.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    orders = paginate_orders(query, after=request.args.get('after'), before=request.args.get('before'), per_page=per_page)
 
-    prev_page = url_for('orders', page=orders.prev_num, status=status, search=search_term) if orders.has_prev else None
-    next_page = url_for('orders', page=orders.next_num, status=status, search=search_term) if orders.has_next else None
+    prev_page = url_for('orders', before=orders.prev_cursor, status=status, search=search_term) if orders.has_prev else None
+    next_page = url_for('orders', after=orders.next_cursor, status=status, search=search_term) if orders.has_next else None
 
-    return render_template('orders.html', orders=orders, prev_page=prev_page, next_page=next_page, status=status, search_term=search_term)
+    # an exact count would scan the whole table, so only the unfiltered list shows an estimate
+    total_orders = estimate_order_count() if status == 'all' and not search_term else None
+
+    return render_template('orders.html', orders=orders, prev_page=prev_page, next_page=next_page, status=status,
+                           search_term=search_term, total_orders=total_orders)
+
+
+#streams every order item as csv or ndjson, for the accounting
+@app.route('/orders/export')
+@replica_reads
+@admin_required
+def export_orders():
+    export_format = request.args.get('format', 'csv')
+    status = request.args.get('status', 'all')
+    start_date = request.args.get('start', '')
+    end_date = request.args.get('end', '')
+
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        # the end date is inclusive so we filter up to the start of the next day
+        end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+    except ValueError:
+        flash('Please enter dates as YYYY-MM-DD.', 'error')
+        return redirect(url_for('orders'))
+
+    complete = {'complete': True, 'not_complete': False}.get(status)
+    rows = export_rows(start=start, end=end, complete=complete)
+    if export_format == 'ndjson':
+        body, mimetype = export_ndjson(rows), 'application/x-ndjson'
+    else:
+        export_format = 'csv'
+        body, mimetype = export_csv(rows), 'text/csv'
 
+    filename = f'orders-{datetime.utcnow():%Y%m%d-%H%M%S}.{export_format}'
+    return Response(stream_with_context(replica_stream(body)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @app.route('/order/<int:order_id>')
 @admin_required  
 def order_details(order_id):
     order = Order.query.get_or_404(order_id)
-    order_items = OrderItem.query.filter_by(order_id=order_id).all()
+    order_items = get_order_items(order_id)
     return render_template('order_details.html', order=order, order_items=order_items)
 
 @app.route('/toggle_order_status/<int:order_id>', methods=['POST'])
@@ -423,20 +674,24 @@ def toggle_order_status(order_id):
 #this is made so you can see the popular and new items 
 #popular items is the most ordered items
 @app.route('/popular_items')
+@replica_reads
+# the page lives as long as the ranking, when that is recomputed and different the pages are invalidated
+@page_cache.cached('popular_items', ttl=app.config['POPULAR_ITEMS_TTL'])
 def popular_items():
-    popular_items = db.session.query(Product, db.func.count(OrderItem.product_id).label('total_orders')) \
-                    .join(OrderItem, Product.id == OrderItem.product_id) \
-                    .group_by(Product.id) \
-                    .order_by(db.desc('total_orders')) \
-                    .limit(4) \
-                    .all()
-                    #you can change the limit if you want more or less items on the page
+    days = request.args.get('days', type=int)
+    if days not in POPULAR_WINDOWS:
+        days = None
+    popular_items = popular_products(limit=4, days=days) #you can change the limit if you want more or less items on the page
     categories = Category.query.all()
 
-    return render_template('popular_items.html', popular_items=popular_items, categories=categories)
+    return render_template('popular_items.html', popular_items=popular_items, categories=categories,
+                           days=days, windows=POPULAR_WINDOWS)
 
 #new items is checked  on the timestamp that the product is added on  in the database
 @app.route('/new_items')
+@replica_reads
+@conditional(catalog_version)
+@page_cache.cached('new_items')
 def new_items():
     new_items = Product.query.order_by(Product.created_at.desc()).limit(4).all() #you can change the limit if you want more or less items on the page
 
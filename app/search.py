@@ -0,0 +1,124 @@
+from app import app, db
+from app.models import Product
+from sqlalchemy import event
+import sqlalchemy as sa
+import click
+import re
+
+SEARCH_PER_PAGE = 12
+MAX_SEARCH_TERMS = 8
+
+# postgres: name weighs most, then the category, then the description.
+# a category rename touches category_id of its products so their vectors are rebuilt as well
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce((SELECT name FROM category WHERE id = NEW.category_id), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, category_id ON product
+    FOR EACH ROW EXECUTE FUNCTION product_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION category_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE product SET category_id = category_id WHERE category_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER category_search_vector_trigger
+    AFTER UPDATE OF name ON category
+    FOR EACH ROW EXECUTE FUNCTION category_search_vector_update()
+    """,
+]
+
+# sqlite (local runs): an fts5 table with the product id as rowid, the prefix option keeps typeahead queries fast
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        name, category_name, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')
+    """,
+    "INSERT INTO product_search(product_search, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_search(rowid, name, category_name, description)
+        VALUES (NEW.id, NEW.name, (SELECT name FROM category WHERE id = NEW.category_id), NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_update AFTER UPDATE OF name, description, category_id ON product BEGIN
+        DELETE FROM product_search WHERE rowid = OLD.id;
+        INSERT INTO product_search(rowid, name, category_name, description)
+        VALUES (NEW.id, NEW.name, (SELECT name FROM category WHERE id = NEW.category_id), NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_delete AFTER DELETE ON product BEGIN
+        DELETE FROM product_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS category_search_update AFTER UPDATE OF name ON category BEGIN
+        UPDATE product_search SET category_name = NEW.name
+        WHERE rowid IN (SELECT id FROM product WHERE category_id = NEW.id);
+    END
+    """,
+]
+
+product_search = sa.table('product_search', sa.column('rowid'), sa.column('rank'))
+
+
+# db.create_all() (local runs) gets the fts table too, on postgres the migration takes care of it
+@event.listens_for(Product.__table__, 'after_create')
+def create_search_index(table, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+
+
+# only words are kept, every word has to match and the last ones may be the start of a word
+def search_terms(q):
+    return re.findall(r'\w+', (q or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def search_products(q, page=1, per_page=SEARCH_PER_PAGE):
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    if db.engine.dialect.name == 'postgresql':
+        tsquery = sa.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        query = Product.query.filter(Product.search_vector.op('@@')(tsquery)) \
+                             .order_by(sa.func.ts_rank_cd(Product.search_vector, tsquery).desc(), Product.id.desc())
+    else:
+        match = ' '.join(f'"{term}"*' for term in terms)
+        query = Product.query.join(product_search, product_search.c.rowid == Product.id) \
+                             .filter(sa.literal_column('product_search').op('MATCH')(match)) \
+                             .order_by(product_search.c.rank, Product.id.desc())
+
+    return query.paginate(page=page, per_page=per_page, error_out=False)
+
+
+@app.cli.command('search-reindex')
+def search_reindex_command():
+    """Rebuild the product search index from the product table."""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(sa.text('UPDATE product SET category_id = category_id'))
+    else:
+        db.session.execute(sa.text('DELETE FROM product_search'))
+        db.session.execute(sa.text(
+            'INSERT INTO product_search(rowid, name, category_name, description) '
+            'SELECT product.id, product.name, category.name, product.description '
+            'FROM product JOIN category ON category.id = product.category_id'))
+    db.session.commit()
+    click.echo(f'Reindexed {Product.query.count()} products.')
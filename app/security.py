@@ -0,0 +1,83 @@
+from app import app
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from werkzeug.security import check_password_hash, generate_password_hash
+import threading
+import time
+
+
+# token bucket per key: every key can do `burst` attempts at once and gets `rate_per_minute` new ones every minute
+class TokenBucketLimiter:
+    def __init__(self, rate_per_minute, burst, max_keys=10000):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed
+
+    # buckets that are full again are the same as no bucket at all
+    def _prune(self, now):
+        for key, (tokens, last) in list(self._buckets.items()):
+            if tokens + (now - last) * self.rate >= self.burst:
+                del self._buckets[key]
+
+
+ip_limiter = TokenBucketLimiter(app.config['LOGIN_RATE_PER_MINUTE'], app.config['LOGIN_BURST'])
+username_limiter = TokenBucketLimiter(app.config['LOGIN_RATE_PER_MINUTE'], app.config['LOGIN_BURST'])
+
+
+# checked before any password is hashed, so a credential stuffing run costs us almost nothing
+def login_allowed(ip, username):
+    ip_ok = ip_limiter.allow(ip)
+    username_ok = username_limiter.allow(username.lower())
+    return ip_ok and username_ok
+
+
+# the password hashing runs on its own small pool, a burst of logins waits there instead of
+# taking the cpu away from every other request
+_hash_pool = ThreadPoolExecutor(max_workers=app.config['PASSWORD_HASH_WORKERS'], thread_name_prefix='password-hash')
+
+
+# returns None when the pool is too busy to answer in time
+def verify_password(user, password):
+    # only the hash goes to the other thread, the database session stays on this one
+    future = _hash_pool.submit(check_password_hash, user.password_hash, password)
+    try:
+        return future.result(timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    except TimeoutError:
+        future.cancel()
+        return None
+
+
+# the method as werkzeug writes it in front of the hash, 'scrypt' comes out as 'scrypt:32768:8:1'
+def hash_prefix(method):
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+password_hash_prefix = hash_prefix(app.config['PASSWORD_HASH_METHOD'])
+
+
+# true when the hash was made with other parameters than PASSWORD_HASH_METHOD
+def password_needs_rehash(user):
+    return user.password_hash.split('$', 1)[0] != password_hash_prefix
+
+
+# hashes the password again on the pool, when the pool is too busy it stays as it is until the next login
+def rehash_password(user, password):
+    future = _hash_pool.submit(generate_password_hash, password, method=app.config['PASSWORD_HASH_METHOD'])
+    try:
+        user.password_hash = future.result(timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    except TimeoutError:
+        future.cancel()
+        return False
+    return True
@@ -0,0 +1,146 @@
+from app import app, db
+from app.models import Product, Category, Order, OrderItem, ProductSalesDay
+import sqlalchemy as sa
+import click
+from datetime import datetime, time, timedelta
+
+STATS_PER_PAGE = 25
+SALES_COLUMNS = ('units_sold', 'revenue', 'order_count', 'basket_share_total')
+
+
+# adds the totals to the ProductSalesDay rows, totals is {(product_id, day): [units, revenue, orders, share]}
+# the increments happen in the database with INSERT ... ON CONFLICT DO UPDATE, so two orders for the same
+# product on the same day add up instead of overwriting each other or failing on the primary key.
+# nothing is committed here so it stays in the same transaction as the caller
+def merge_sales(totals):
+    if not totals:
+        return
+    rows = [dict(product_id=product_id, day=day, units_sold=units, revenue=revenue, order_count=orders,
+                 basket_share_total=share)
+            for (product_id, day), (units, revenue, orders, share) in sorted(totals.items())]
+    dialect = db.engine.dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(ProductSalesDay)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ProductSalesDay.product_id, ProductSalesDay.day],
+            set_={column: getattr(ProductSalesDay, column) + getattr(statement.excluded, column)
+                  for column in SALES_COLUMNS})
+        # executemany, a rebuilt day can touch more rows than fit in one VALUES list
+        db.session.execute(statement, rows)
+        return
+
+    # other databases: increment in SQL and only insert the rows that did not exist yet
+    for row in rows:
+        updated = ProductSalesDay.query.filter_by(product_id=row['product_id'], day=row['day']) \
+                                       .update({getattr(ProductSalesDay, column): getattr(ProductSalesDay, column) + row[column]
+                                                for column in SALES_COLUMNS}, synchronize_session=False)
+        if not updated:
+            db.session.add(ProductSalesDay(**row))
+
+
+def add_sale(totals, product_id, day, quantity, price, order_total):
+    revenue = quantity * price
+    share = revenue / order_total if order_total else 0
+    values = totals.setdefault((product_id, day), [0, 0, 0, 0])
+    values[0] += quantity
+    values[1] += revenue
+    values[2] += 1
+    values[3] += share
+
+
+# called by place_order before the commit, lines are (product_id, quantity, price) for every order item
+def record_sales(order, lines):
+    totals = {}
+    for product_id, quantity, price in lines:
+        add_sale(totals, product_id, order.date_ordered.date(), quantity, price, order.total_price)
+    merge_sales(totals)
+
+
+# regenerates the rollup from the order history, one day per transaction so checkouts only wait for the day
+# that is being rebuilt. on postgres the lock keeps record_sales out while a day is deleted and recounted, so
+# an order is never counted twice or lost. revenue comes from the price paid (OrderItem.unit_price)
+def rebuild_sales_rollup():
+    first_order, last_order = db.session.execute(
+        sa.select(sa.func.min(Order.date_ordered), sa.func.max(Order.date_ordered))).one()
+    first_rollup, last_rollup = db.session.execute(
+        sa.select(sa.func.min(ProductSalesDay.day), sa.func.max(ProductSalesDay.day))).one()
+    days = [day for day in (first_order and first_order.date(), last_order and last_order.date(),
+                            first_rollup, last_rollup) if day]
+    db.session.commit()
+    if not days:
+        return
+
+    day = min(days)
+    while day <= max(days):
+        rebuild_sales_day(day)
+        day += timedelta(days=1)
+
+
+def rebuild_sales_day(day):
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(sa.text('LOCK TABLE product_sales_day IN EXCLUSIVE MODE'))
+    ProductSalesDay.query.filter_by(day=day).delete()
+
+    start = datetime.combine(day, time.min)
+    rows = db.session.execute(
+        sa.select(OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price, Order.total_price)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.date_ordered >= start, Order.date_ordered < start + timedelta(days=1))).all()
+
+    totals = {}
+    for product_id, quantity, price, order_total in rows:
+        add_sale(totals, product_id, day, quantity, price, order_total)
+    merge_sales(totals)
+    db.session.commit()
+
+
+@app.cli.command('rebuild-sales-rollup')
+def rebuild_sales_rollup_command():
+    """Rebuild the daily sales rollup from all orders, one day at a time."""
+    rebuild_sales_rollup()
+    click.echo(f'Rebuilt {ProductSalesDay.query.count()} sales rollup rows.')
+
+
+# one grouped query over the rollup, its size depends on the catalog and not on the order history
+def sales_subquery(start=None, end=None):
+    query = sa.select(
+        ProductSalesDay.product_id.label('product_id'),
+        sa.func.sum(ProductSalesDay.units_sold).label('units_sold'),
+        sa.func.sum(ProductSalesDay.revenue).label('revenue'),
+        sa.func.sum(ProductSalesDay.order_count).label('order_count'),
+        sa.func.sum(ProductSalesDay.basket_share_total).label('basket_share_total')
+    )
+
+    if start:
+        query = query.where(ProductSalesDay.day >= start.date())
+    if end:
+        query = query.where(ProductSalesDay.day < end.date())
+
+    return query.group_by(ProductSalesDay.product_id).subquery()
+
+
+# the outer join makes sure products that are never sold still show up with 0
+def product_statistics(start=None, end=None, category_id=None, page=1, per_page=STATS_PER_PAGE):
+    sales = sales_subquery(start, end)
+    query = db.session.query(
+        Product.id,
+        Product.name,
+        Category.name.label('category_name'),
+        sa.func.coalesce(sales.c.units_sold, 0).label('total_sold'),
+        sa.func.coalesce(sales.c.revenue, 0).label('revenue'),
+        sa.func.coalesce(sales.c.order_count, 0).label('order_count'),
+        sa.func.coalesce(sales.c.basket_share_total / sa.func.nullif(sales.c.order_count, 0), 0).label('basket_share')
+    ).join(Category, Category.id == Product.category_id) \
+     .outerjoin(sales, sales.c.product_id == Product.id)
+
+    if category_id:
+        query = query.filter(Product.category_id == category_id)
+
+    return query.order_by(sa.desc('total_sold'), Product.name) \
+                .paginate(page=page, per_page=per_page, error_out=False)
+
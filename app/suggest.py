@@ -0,0 +1,126 @@
+from app import app, db
+from app.cache import page_cache
+from app.models import Product, Category
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+import threading
+import time
+import unicodedata
+
+SUGGEST_LIMIT = 8
+
+
+# lowercase without accents or double spaces, so "Crème  Brûlée" and "creme brulee" are the same key
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+# a sorted list of (key, kind, id), a prefix lookup is a binary search and a short walk to the right.
+# every word of a name starts a key, so "candle" also finds "Scented Candle"
+class PrefixIndex:
+    def __init__(self):
+        self.loaded = False
+        self.version = None
+        self.expires = 0
+        self._keys = []
+        self._names = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries(kind, item_id, name):
+        words = normalize(name).split()
+        return {(' '.join(words[i:]), kind, item_id) for i in range(len(words))}
+
+    def load(self, items, version=None, ttl=None):
+        names = {(kind, item_id): name for kind, item_id, name in items}
+        keys = sorted(entry for (kind, item_id), name in names.items()
+                      for entry in self._entries(kind, item_id, name))
+        with self._lock:
+            self._names = names
+            self._keys = keys
+            self.loaded = True
+            self.version = version
+            self.expires = time.monotonic() + ttl if ttl else float('inf')
+
+    # other workers and the import-products command change the catalog too, they invalidate the 'index'
+    # pages. with a shared page cache backend that is seen right away, otherwise after the ttl
+    def is_stale(self, version):
+        return not self.loaded or self.version != version or self.expires < time.monotonic()
+
+    def add(self, kind, item_id, name):
+        with self._lock:
+            self._remove(kind, item_id)
+            self._names[(kind, item_id)] = name
+            for entry in self._entries(kind, item_id, name):
+                insort(self._keys, entry)
+
+    def remove(self, kind, item_id):
+        with self._lock:
+            self._remove(kind, item_id)
+
+    def _remove(self, kind, item_id):
+        name = self._names.pop((kind, item_id), None)
+        if name is None:
+            return
+        for entry in self._entries(kind, item_id, name):
+            i = bisect_left(self._keys, entry)
+            if i < len(self._keys) and self._keys[i] == entry:
+                del self._keys[i]
+
+    def search(self, prefix, limit=SUGGEST_LIMIT):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(results) < limit:
+                key, kind, item_id = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                if (kind, item_id) not in seen:
+                    seen.add((kind, item_id))
+                    results.append((kind, item_id, self._names[(kind, item_id)]))
+                i += 1
+        return results
+
+
+suggestions = PrefixIndex()
+
+
+_reload_lock = threading.Lock()
+
+
+# the only database access, once per catalog change or SUGGEST_TTL
+def load_suggestions(version=None):
+    products = db.session.query(Product.id, Product.name).all()
+    categories = db.session.query(Category.id, Category.name).all()
+    suggestions.load([('category', item_id, name) for item_id, name in categories] +
+                     [('product', item_id, name) for item_id, name in products],
+                     version=version, ttl=app.config['SUGGEST_TTL'])
+
+
+def suggest(q, limit=SUGGEST_LIMIT):
+    version = page_cache.version('index')
+    if suggestions.is_stale(version):
+        with _reload_lock:
+            if suggestions.is_stale(version):
+                load_suggestions(version)
+    return suggestions.search(q, limit)
+
+
+# for a change this worker makes itself with suggestions.add() or remove() and then invalidates the 'index'
+# pages: when the index was current and nobody else invalidated in between, it takes the new version
+# instead of reloading the whole catalog on the next suggest()
+@contextmanager
+def local_catalog_change():
+    with _reload_lock:
+        before = page_cache.version('index')
+        current = not suggestions.is_stale(before)
+        yield
+        after = page_cache.version('index')
+        if current and after == before + 1:
+            suggestions.version = after
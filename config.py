@@ -11,6 +11,52 @@ class Config:
                                                            f"/{os.environ.get('DB_NAME')}"
                                                            )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    #connection pool per worker process, only used for postgres
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 10)
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    #in milliseconds for the queries of a web request, 0 means no limit
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT') or 30000)
+    #optional read replica for the pages that only read, like the catalog and the statistics
+    DB_REPLICA_URI = os.environ.get('DB_REPLICA_URI')
+    #after a write the visitor reads from the primary for this many seconds, so the replica can catch up
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS') or 10)
+    #the popular items ranking is cached in memory for this many seconds
+    POPULAR_ITEMS_TTL = int(os.environ.get('POPULAR_ITEMS_TTL') or 300)
+    POPULAR_ITEMS_TOP_N = int(os.environ.get('POPULAR_ITEMS_TOP_N') or 20)
+    #give older sales less weight, in days, leave empty to count every sale the same
+    POPULAR_ITEMS_HALF_LIFE = float(os.environ.get('POPULAR_ITEMS_HALF_LIFE') or 0) or None
+    POPULAR_ITEMS_REFRESH_ON_ORDER = os.environ.get('POPULAR_ITEMS_REFRESH_ON_ORDER') == '1'
+    #the typeahead names are reloaded after this many seconds, or sooner when the catalog pages are invalidated
+    SUGGEST_TTL = int(os.environ.get('SUGGEST_TTL') or 60)
+    #the cache for the catalog pages, 'memory', 'null' or the import path of your own backend class
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND') or 'memory'
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE') or 512)
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL') or 600)
+    #number of background threads that resize uploaded product images
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS') or 1)
+    #pages smaller than this many bytes are sent uncompressed, the level is used for gzip and brotli
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 5)
+    #how long the username and admin rights of a logged in user are trusted before they are read again
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 300)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    #werkzeug hash method, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000', passwords are rehashed on login when it changes
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT') or 5)
+    #login attempts per minute per ip address and per username, the burst is how many are allowed at once
+    LOGIN_RATE_PER_MINUTE = int(os.environ.get('LOGIN_RATE_PER_MINUTE') or 10)
+    LOGIN_BURST = int(os.environ.get('LOGIN_BURST') or 5)
+    #number of reverse proxies in front of the app, their X-Forwarded-* headers give the real client address.
+    #leave at 0 for a direct connection, otherwise every login counts against the proxy's ip address
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS') or 0)
+    #counts the queries of every request, sends them in a Server-Timing header and logs the slow ones
+    SQL_PROFILER = os.environ.get('SQL_PROFILER', '1') == '1'
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS') or 100)
+    SQL_PROFILER_TOP = int(os.environ.get('SQL_PROFILER_TOP') or 5)
     #this is for if i want to add a mail function
     #MAIL_SERVER = os.environ.get('MAIL_SERVER')  
     #MAIL_PORT =587
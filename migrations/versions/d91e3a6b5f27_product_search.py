@@ -0,0 +1,122 @@
+"""product search
+
+Revision ID: d91e3a6b5f27
+Revises: c2d8f4b1e907
+Create Date: 2026-10-18 15:02:37.514390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91e3a6b5f27'
+down_revision = 'c2d8f4b1e907'
+branch_labels = None
+depends_on = None
+
+# same statements as app/search.py at the time of this migration
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce((SELECT name FROM category WHERE id = NEW.category_id), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, category_id ON product
+    FOR EACH ROW EXECUTE FUNCTION product_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION category_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE product SET category_id = category_id WHERE category_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER category_search_vector_trigger
+    AFTER UPDATE OF name ON category
+    FOR EACH ROW EXECUTE FUNCTION category_search_vector_update()
+    """,
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        name, category_name, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')
+    """,
+    "INSERT INTO product_search(product_search, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_search(rowid, name, category_name, description)
+        VALUES (NEW.id, NEW.name, (SELECT name FROM category WHERE id = NEW.category_id), NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_update AFTER UPDATE OF name, description, category_id ON product BEGIN
+        DELETE FROM product_search WHERE rowid = OLD.id;
+        INSERT INTO product_search(rowid, name, category_name, description)
+        VALUES (NEW.id, NEW.name, (SELECT name FROM category WHERE id = NEW.category_id), NEW.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_delete AFTER DELETE ON product BEGIN
+        DELETE FROM product_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS category_search_update AFTER UPDATE OF name ON category BEGIN
+        UPDATE product_search SET category_name = NEW.name
+        WHERE rowid IN (SELECT id FROM product WHERE category_id = NEW.id);
+    END
+    """,
+]
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR().with_variant(sa.Text(), 'sqlite'), nullable=True))
+        batch_op.create_index('ix_product_search_vector', ['search_vector'], unique=False, postgresql_using='gin')
+
+    # ### end Alembic commands ###
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in POSTGRES_DDL:
+            op.execute(statement)
+        # fires the trigger for every existing product
+        op.execute("UPDATE product SET category_id = category_id")
+    else:
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO product_search(rowid, name, category_name, description) "
+                   "SELECT product.id, product.name, category.name, product.description "
+                   "FROM product JOIN category ON category.id = product.category_id")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS category_search_vector_trigger ON category")
+        op.execute("DROP TRIGGER IF EXISTS product_search_vector_trigger ON product")
+        op.execute("DROP FUNCTION IF EXISTS category_search_vector_update()")
+        op.execute("DROP FUNCTION IF EXISTS product_search_vector_update()")
+    else:
+        for trigger in ('product_search_insert', 'product_search_update', 'product_search_delete', 'category_search_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS product_search")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_search_vector', postgresql_using='gin')
+        batch_op.drop_column('search_vector')
+
+    # ### end Alembic commands ###
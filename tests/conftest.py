@@ -0,0 +1,104 @@
+import os
+import re
+import tempfile
+
+# the app reads its configuration on import, so the test database has to be set up first
+_db_folder = tempfile.mkdtemp()
+os.environ['DB_URI'] = 'sqlite:///' + os.path.join(_db_folder, 'test.db')
+os.environ['LOGIN_BURST'] = '1000'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+
+import pytest
+import sqlalchemy as sa
+from app import app as flask_app, db
+from app.cache import page_cache
+from app.identity import _identities
+from app.models import User, Category, Product, CartItem
+from app.popularity import refresh_popular_products
+from app.suggest import suggestions
+
+
+# the benchmarks seed a lot of data and take a while, they only run with `pytest --benchmark -s`
+def pytest_addoption(parser):
+    parser.addoption('--benchmark', action='store_true', help='also run the tests marked benchmark')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: slow test that measures throughput or latency')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='benchmark, run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        db.create_all()
+    page_cache.backend.clear()
+    _identities.clear()
+    refresh_popular_products()
+    suggestions.loaded = False
+
+    yield flask_app
+
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        # the fts table is not part of the models, see app/search.py
+        with db.engine.begin() as connection:
+            connection.execute(sa.text('DROP TABLE IF EXISTS product_search'))
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# a customer, an admin and a few products in two categories
+@pytest.fixture
+def shop(app):
+    with app.app_context():
+        customer = User(username='customer', email='customer@example.com', country='BE', street='Kerkstraat',
+                        postal_number=9000, house_number=1)
+        customer.set_password('password')
+        admin = User(username='admin', email='admin@example.com', admin_rights=True, country='BE',
+                     street='Kerkstraat', postal_number=9000, house_number=2)
+        admin.set_password('password')
+        candles = Category(name='Candles')
+        dice = Category(name='Dice')
+        db.session.add_all([customer, admin, candles, dice])
+        db.session.flush()
+        products = [Product(name=f'Candle {i}', description='A candle', price=5 + i, category_id=candles.id,
+                            image_filename='candle.jpg') for i in range(3)]
+        products += [Product(name=f'Dice {i}', description='A set of dice', price=10 + i, category_id=dice.id,
+                             image_filename='candle.jpg') for i in range(3)]
+        db.session.add_all(products)
+        db.session.commit()
+        return {'customer': customer.id, 'admin': admin.id, 'products': [product.id for product in products],
+                'categories': [candles.id, dice.id]}
+
+
+def fill_cart(app, user_id, product_ids, quantity=1):
+    with app.app_context():
+        db.session.add_all([CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
+                            for product_id in product_ids])
+        db.session.commit()
+
+
+def login(client, username, password='password'):
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    return response
+
+
+# the number of statements a request sent to the database, taken from the profiler's Server-Timing header
+def query_count(response):
+    match = re.search(r'desc="(\d+) queries"', response.headers.get('Server-Timing', ''))
+    return int(match.group(1)) if match else 0
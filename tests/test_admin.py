@@ -0,0 +1,19 @@
+from app import db
+from app.models import User
+from conftest import login
+
+
+def test_admin_pages_are_refused_to_customers(client, shop):
+    login(client, 'customer')
+    assert client.get('/orders').status_code == 403
+
+
+def test_revoked_admin_rights_take_effect_in_open_sessions(app, client, shop):
+    login(client, 'admin')
+    assert client.get('/orders').status_code == 200
+
+    with app.app_context():
+        db.session.get(User, shop['admin']).admin_rights = False
+        db.session.commit()
+
+    assert client.get('/orders').status_code == 403
@@ -0,0 +1,79 @@
+import io
+import json
+import time
+
+import pytest
+import sqlalchemy as sa
+
+from app import db
+from app.bulk_import import import_products, read_records, IMPORT_BATCH_SIZE
+from app.models import Product
+
+
+def run_import(app, text, filename):
+    with app.app_context():
+        result = import_products(read_records(io.StringIO(text), filename))
+        names = {product.name for product in Product.query}
+    return result, names
+
+
+def test_a_broken_json_line_only_skips_that_row(app, shop):
+    text = ('\n{"name": "J1", "description": "d", "price": 4, "category": "Candles"}\n'
+            'not json\n'
+            '{"name": "J2", "description": "d", "price": 4, "category": "New"}\n')
+
+    result, names = run_import(app, text, 'products.jsonl')
+
+    assert result['imported'] == 2
+    assert result['categories_created'] == 1
+    assert [number for number, errors in result['errors']] == [3]
+    assert result['errors'][0][1][0].startswith('invalid json')
+    assert {'J1', 'J2'} <= names
+
+
+def test_csv_rows_are_checked_with_the_product_form_rules(app, shop):
+    text = ('name,description,price,category,image\n'
+            'C1,d,4.5,Candles,\n'
+            'C2,,abc,Candles,\n'
+            'C3,d,4,,\n'
+            'C4,d,4,Candles,c4.gif\n')
+
+    result, names = run_import(app, text, 'products.csv')
+
+    assert result['imported'] == 1
+    assert [number for number, errors in result['errors']] == [3, 4, 5]
+    assert 'C1' in names and not {'C2', 'C3', 'C4'} & names
+
+
+def test_a_bad_row_leaves_nothing_behind_for_the_next_one(app, shop):
+    text = ('name,description,price,category,image\n'
+            ',,abc,,\n'
+            'C1,d,4.5,Candles,\n')
+
+    result, names = run_import(app, text, 'products.csv')
+
+    assert result['imported'] == 1
+    assert [number for number, errors in result['errors']] == [2]
+    assert 'C1' in names
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('batch_size', [100, IMPORT_BATCH_SIZE, 2000])
+@pytest.mark.parametrize('filename', ['products.csv', 'products.jsonl'])
+def test_import_rows_per_second(app, shop, filename, batch_size):
+    count = 20000
+    if filename.endswith('.csv'):
+        text = 'name,description,price,category,image\n' + ''.join(
+            f'Imported {i},Seeded row {i},{i % 90 + 1}.5,Category {i % 40},\n' for i in range(count))
+    else:
+        text = ''.join(json.dumps({'name': f'Imported {i}', 'description': f'Seeded row {i}', 'price': i % 90 + 1.5,
+                                   'category': f'Category {i % 40}'}) + '\n' for i in range(count))
+
+    with app.app_context():
+        start = time.perf_counter()
+        result = import_products(read_records(io.StringIO(text), filename), batch_size=batch_size)
+        rate = count / (time.perf_counter() - start)
+
+    print(f'\n{count} rows of {filename} in batches of {batch_size}: {rate:.0f} rows/s')
+    assert result['imported'] == count
+    assert rate > 4000
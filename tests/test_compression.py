@@ -0,0 +1,63 @@
+import gzip
+import os
+import shutil
+import statistics
+import time
+
+import brotli
+import pytest
+
+STYLES = os.path.join(os.path.dirname(__file__), '..', 'app', 'static', 'css', 'styles.css')
+
+
+@pytest.fixture
+def static_folder(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    return tmp_path
+
+
+def test_the_precompressed_file_is_served(app, client, static_folder):
+    (static_folder / 'site.css').write_text('body { color: red; }\n' * 100)
+    app.test_cli_runner().invoke(args=['assets-compress'])
+
+    response = client.get('/static/site.css', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert gzip.decompress(response.data) == (static_folder / 'site.css').read_bytes()
+
+
+def test_a_stale_copy_is_not_served(app, client, static_folder):
+    source = static_folder / 'site.css'
+    source.write_text('body { color: red; }\n' * 100)
+    app.test_cli_runner().invoke(args=['assets-compress'])
+    source.write_text('body { color: blue; }\n' * 100)
+    later = os.path.getmtime(str(source) + '.gz') + 10
+    os.utime(source, (later, later))
+
+    for encoding in ('gzip', 'br'):
+        response = client.get('/static/site.css', headers={'Accept-Encoding': encoding})
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == source.read_bytes()
+
+
+@pytest.mark.benchmark
+def test_static_bytes_and_time_to_first_byte(app, client, static_folder):
+    shutil.copy(STYLES, static_folder / 'styles.css')
+    app.test_cli_runner().invoke(args=['assets-compress'])
+    sizes = {}
+    for encoding in ('identity', 'gzip', 'br'):
+        timings = []
+        for _ in range(200):
+            start = time.perf_counter()
+            response = client.get('/static/styles.css', headers={'Accept-Encoding': encoding}, buffered=False)
+            next(response.iter_encoded())
+            timings.append((time.perf_counter() - start) * 1000)
+            response.close()
+        response = client.get('/static/styles.css', headers={'Accept-Encoding': encoding})
+        sizes[encoding] = len(response.data)
+        print(f'\nstyles.css {encoding}: {sizes[encoding]} bytes, ttfb median {statistics.median(timings):.2f} ms')
+
+    assert brotli.decompress(response.data) == open(STYLES, 'rb').read()
+    assert sizes['br'] < sizes['gzip'] < sizes['identity'] / 4
@@ -0,0 +1,34 @@
+def test_compressed_pages_get_their_own_etag(client, shop):
+    identity = client.get('/', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] != identity.headers['ETag']
+    assert compressed.headers['ETag'] == identity.headers['ETag'][:-1] + '-gzip"'
+
+
+def test_the_compressed_etag_revalidates(client, shop):
+    etag = client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+
+def test_catalog_pages_have_no_last_modified(app, client, shop):
+    response = client.get('/')
+    assert 'Last-Modified' not in response.headers
+
+    # a delete doesn't change max(updated_at), if-modified-since alone must not give a 304
+    response = client.get('/', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert response.status_code == 200
+
+
+def test_product_pages_keep_last_modified(client, shop):
+    response = client.get(f'/product/{shop["products"][0]}')
+    assert 'Last-Modified' in response.headers
+
+    response = client.get(f'/product/{shop["products"][0]}',
+                          headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert response.status_code == 304
@@ -0,0 +1,25 @@
+import csv
+import io
+
+from app import db
+from app.models import Order, Product
+from conftest import fill_cart, login
+
+
+def test_the_export_has_the_price_paid(app, client, shop):
+    product_id = shop['products'][0]
+    fill_cart(app, shop['customer'], [product_id], quantity=3)
+    login(client, 'customer')
+    client.post('/place_order')
+    client.get('/logout')
+    with app.app_context():
+        db.session.get(Product, product_id).price = 99
+        db.session.commit()
+        total_price = Order.query.one().total_price
+    login(client, 'admin')
+
+    rows = list(csv.DictReader(io.StringIO(client.get('/orders/export').get_data(as_text=True))))
+
+    assert len(rows) == 1
+    assert float(rows[0]['unit_price']) == 5
+    assert float(rows[0]['unit_price']) * int(rows[0]['quantity']) == float(rows[0]['total_price']) == total_price
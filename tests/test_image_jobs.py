@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+
+from app import db
+from app.images import _available
+from app.models import ImageJob
+
+
+@pytest.fixture
+def images_folder(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    Image.new('RGB', (400, 300), 'red').save(tmp_path / 'candle.jpg')
+    yield tmp_path
+    _available.clear()
+
+
+def add_job(app, status, age):
+    with app.app_context():
+        job = ImageJob(filename='candle.jpg', status=status, created_at=datetime.utcnow() - age)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def job_status(app, job_id):
+    with app.app_context():
+        return db.session.get(ImageJob, job_id).status
+
+
+def test_a_job_left_running_is_run_again(app, images_folder):
+    stuck = add_job(app, 'running', timedelta(hours=2))
+    busy = add_job(app, 'running', timedelta(minutes=1))
+
+    result = app.test_cli_runner().invoke(args=['image-jobs-run'])
+
+    assert result.exit_code == 0
+    assert job_status(app, stuck) == 'done'
+    assert job_status(app, busy) == 'running'
+    assert (images_folder / 'derivatives' / 'candle-320.jpg').exists()
+
+
+def test_stuck_jobs_can_be_left_alone(app, images_folder):
+    stuck = add_job(app, 'running', timedelta(hours=2))
+    pending = add_job(app, 'pending', timedelta(hours=2))
+
+    app.test_cli_runner().invoke(args=['image-jobs-run', '--stale-minutes', '0'])
+
+    assert job_status(app, stuck) == 'running'
+    assert job_status(app, pending) == 'done'
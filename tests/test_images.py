@@ -0,0 +1,53 @@
+import pytest
+from PIL import Image
+
+from app.images import available_widths, generate_derivatives, product_image, _available
+
+
+@pytest.fixture
+def images_folder(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    _available.clear()
+    yield tmp_path
+    _available.clear()
+
+
+def save_image(folder, filename, width, height, orientation=None):
+    image = Image.new('RGB', (width, height), 'red')
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(folder / filename, exif=exif)
+
+
+def test_the_generated_widths_are_found(app, images_folder):
+    save_image(images_folder, 'large.jpg', 800, 600)
+
+    assert generate_derivatives('large.jpg') == [320, 640]
+    with app.test_request_context():
+        assert available_widths('large.jpg') == [320, 640]
+
+
+def test_a_small_image_is_served_at_its_own_width(app, images_folder):
+    save_image(images_folder, 'small.jpg', 200, 150)
+    generate_derivatives('small.jpg')
+
+    with app.test_request_context():
+        assert available_widths('small.jpg') == [200]
+        assert 'derivatives/small-200.jpg' in product_image('small.jpg', 'Small')
+
+
+def test_a_rotated_small_image_uses_the_rotated_width(app, images_folder):
+    save_image(images_folder, 'rotated.jpg', 150, 200, orientation=6)
+
+    assert generate_derivatives('rotated.jpg') == [200]
+    with app.test_request_context():
+        assert available_widths('rotated.jpg') == [200]
+
+
+def test_no_derivatives_yet_falls_back_to_the_original(app, images_folder):
+    save_image(images_folder, 'new.jpg', 200, 150)
+
+    with app.test_request_context():
+        assert available_widths('new.jpg') == []
+        assert '<picture>' not in product_image('new.jpg', 'New')
@@ -0,0 +1,43 @@
+from sqlalchemy import event
+from app import db
+from app.cart import get_cart_items, get_order_items
+from app.catalog import category_products
+
+
+# the sqlite query plan of every statement func sends, one line per step
+def query_plans(func, *args):
+    statements = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', collect)
+    try:
+        func(*args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', collect)
+
+    with db.engine.connect() as connection:
+        return [' / '.join(row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+                for statement, parameters in statements]
+
+
+def test_cart_lookup_uses_the_user_product_constraint(app, shop):
+    with app.app_context():
+        plan, = query_plans(get_cart_items, shop['customer'])
+    # sqlite names the index of a unique constraint created with the table sqlite_autoindex_cart_item_<n>
+    assert 'SEARCH cart_item USING INDEX sqlite_autoindex_cart_item' in plan or \
+           'SEARCH cart_item USING INDEX uq_cart_item_user_product' in plan
+
+
+def test_order_items_lookup_uses_the_order_id_index(app, shop):
+    with app.app_context():
+        plan, = query_plans(get_order_items, 1)
+    assert 'SEARCH order_item USING INDEX ix_order_item_order_id (order_id=?)' in plan
+
+
+def test_category_listing_uses_the_category_id_index(app, shop):
+    with app.app_context():
+        plans = query_plans(category_products, shop['categories'][0])
+    assert plans
+    assert all('ix_product_category_id (category_id=?)' in plan for plan in plans)
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+from app.security import hash_prefix, password_hash_prefix
+from conftest import login
+
+
+def test_the_short_method_names_are_normalised():
+    assert hash_prefix('scrypt') == 'scrypt:32768:8:1'
+    assert password_hash_prefix == 'pbkdf2:sha256:1000'
+
+
+def test_a_current_hash_is_kept(app, client, shop):
+    with app.app_context():
+        before = db.session.get(User, shop['customer']).password_hash
+
+    login(client, 'customer')
+
+    with app.app_context():
+        assert db.session.get(User, shop['customer']).password_hash == before
+
+
+def test_an_old_hash_is_replaced_on_login(app, client, shop):
+    with app.app_context():
+        db.session.get(User, shop['customer']).password_hash = generate_password_hash('password', method='pbkdf2:sha256:500')
+        db.session.commit()
+
+    login(client, 'customer')
+
+    with app.app_context():
+        password_hash = db.session.get(User, shop['customer']).password_hash
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+    client.get('/logout')
+    assert login(client, 'customer').headers['Location'] == '/index'
+
+
+@pytest.mark.benchmark
+def test_logins_per_second(app, shop):
+    logins, threads = 200, 8
+    with app.app_context():
+        hasher = User.query.first().password_hash.split('$', 1)[0]
+
+    def run(count):
+        client = app.test_client()
+        for _ in range(count):
+            login(client, 'customer')
+            client.get('/logout')
+
+    workers = [threading.Thread(target=run, args=(logins // threads,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    rate = logins / (time.perf_counter() - start)
+
+    print(f'\n{logins} logins with {hasher} on {app.config["PASSWORD_HASH_WORKERS"]} hash workers: {rate:.0f} logins/s')
+    assert rate > 50
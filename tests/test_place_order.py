@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+from app import db
+from app.models import User, CartItem, Order, OrderItem, ProductSalesDay
+import app.routes as routes
+from conftest import fill_cart, login
+
+
+# both checkouts read the cart before either of them writes, the worst case for the cart lock
+@pytest.fixture
+def read_cart_together(monkeypatch):
+    barrier = threading.Barrier(2, timeout=5)
+    get_cart_items = routes.get_cart_items
+
+    def get_cart_items_together(*args, **kwargs):
+        items = get_cart_items(*args, **kwargs)
+        barrier.wait()
+        return items
+
+    monkeypatch.setattr(routes, 'get_cart_items', get_cart_items_together)
+
+
+def checkout_in_parallel(clients):
+    responses = [None] * len(clients)
+
+    def checkout(i):
+        responses[i] = clients[i].post('/place_order')
+
+    threads = [threading.Thread(target=checkout, args=(i,)) for i in range(len(clients))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    return responses
+
+
+def test_parallel_checkouts_of_one_cart_place_one_order(app, shop, read_cart_together):
+    fill_cart(app, shop['customer'], shop['products'][:1], quantity=2)
+    clients = [app.test_client(), app.test_client()]
+    for client in clients:
+        login(client, 'customer')
+
+    responses = checkout_in_parallel(clients)
+
+    assert sorted(response.headers['Location'] for response in responses) == ['/cart', '/index']
+    with app.app_context():
+        assert Order.query.count() == 1
+        assert OrderItem.query.count() == 1
+        assert CartItem.query.count() == 0
+        assert db.session.query(db.func.sum(ProductSalesDay.units_sold)).scalar() == 2
+
+
+def test_parallel_checkouts_of_different_users_all_succeed(app, shop):
+    clients = []
+    with app.app_context():
+        for i in range(8):
+            user = User(username=f'user{i}', email=f'user{i}@example.com', country='BE', street='Kerkstraat',
+                        postal_number=9000, house_number=i)
+            user.set_password('password')
+            db.session.add(user)
+        db.session.commit()
+        user_ids = [user.id for user in User.query.filter(User.username.like('user%'))]
+    for i, user_id in enumerate(user_ids):
+        fill_cart(app, user_id, shop['products'][:3], quantity=2)
+        client = app.test_client()
+        login(client, f'user{i}')
+        clients.append(client)
+
+    responses = checkout_in_parallel(clients)
+
+    assert all(response.headers['Location'] == '/index' for response in responses)
+    with app.app_context():
+        assert Order.query.count() == 8
+        assert OrderItem.query.count() == 24
+        assert CartItem.query.count() == 0
+        assert db.session.query(db.func.sum(ProductSalesDay.units_sold)).scalar() == 48
+
+
+def test_a_failed_order_shows_no_database_details(app, client, shop, monkeypatch, caplog):
+    fill_cart(app, shop['customer'], shop['products'][:1])
+    login(client, 'customer')
+
+    def broken_record_sales(order, lines):
+        raise RuntimeError('INSERT INTO product_sales_day secret parameters')
+    monkeypatch.setattr(routes, 'record_sales', broken_record_sales)
+
+    response = client.post('/place_order')
+
+    assert response.headers['Location'] == '/checkout'
+    with client.session_transaction() as session:
+        messages = [message for category, message in session['_flashes']]
+    assert messages == ['Something went wrong while placing your order, please try again.']
+    assert 'secret parameters' in caplog.text
+    with app.app_context():
+        assert Order.query.count() == 0
+        assert CartItem.query.count() == 1
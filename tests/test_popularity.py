@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app import db
+from app.cache import page_cache
+from app.models import Order, OrderItem, Product, ProductSalesDay
+from app import popularity
+from app.popularity import popular_products, compute_ranking
+from app.stats import rebuild_sales_rollup
+
+
+def sell(app, product_id, order_count):
+    with app.app_context():
+        db.session.add(ProductSalesDay(product_id=product_id, day=datetime.utcnow().date(), units_sold=order_count,
+                                       order_count=order_count, revenue=order_count))
+        db.session.commit()
+
+
+def popular_names(client):
+    return [name for name in ('Candle 0', 'Candle 1', 'Candle 2', 'Dice 0', 'Dice 1', 'Dice 2')
+            if name in client.get('/popular_items').get_data(as_text=True)]
+
+
+# what the next view past the page cache does once POPULAR_ITEMS_TTL is over
+def recompute_ranking(app, days=None):
+    popularity._rankings[days] = (0, popularity._rankings[days][1])
+    with app.app_context():
+        popular_products(days=days)
+
+
+def test_a_new_ranking_invalidates_the_cached_pages(app, client, shop):
+    sell(app, shop['products'][0], 3)
+    assert popular_names(client) == ['Candle 0']
+
+    sell(app, shop['products'][4], 5)
+    assert popular_names(client) == ['Candle 0']
+    recompute_ranking(app)
+
+    assert popular_names(client) == ['Candle 0', 'Dice 1']
+
+
+def test_an_unchanged_ranking_keeps_the_cached_pages(app, client, shop):
+    sell(app, shop['products'][0], 3)
+    client.get('/popular_items')
+    version = page_cache.version('popular_items')
+
+    recompute_ranking(app)
+
+    assert page_cache.version('popular_items') == version
+
+
+# what popular_items() ran on every view before the ranking was precomputed
+def live_ranking(limit=4):
+    return db.session.query(Product, sa.func.count(OrderItem.id).label('order_count')) \
+                     .join(OrderItem, OrderItem.product_id == Product.id) \
+                     .group_by(Product.id) \
+                     .order_by(sa.func.count(OrderItem.id).desc()) \
+                     .limit(limit).all()
+
+
+def timed(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+@pytest.mark.benchmark
+def test_popular_items_latency(app, client, shop):
+    count = 100000
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.execute(sa.insert(Product), [
+            {'name': f'Seeded {i}', 'description': 'seeded', 'price': 1, 'category_id': shop['categories'][i % 2],
+             'image_filename': 'candle.jpg'} for i in range(1000)])
+        product_ids = db.session.scalars(sa.select(Product.id)).all()
+        db.session.execute(sa.insert(Order), [
+            {'id': i, 'user_id': shop['customer'], 'total_price': 1, 'date_ordered': now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+             'country': 'BE', 'street': 'Kerkstraat', 'postal_number': '9000', 'house_number': '1'} for i in range(1, count + 1)])
+        db.session.execute(sa.insert(OrderItem), [
+            {'order_id': i, 'product_id': rng.choice(product_ids[:50] * 5 + product_ids), 'quantity': 1, 'unit_price': 1}
+            for i in range(1, count + 1)])
+        db.session.commit()
+        rebuild_sales_rollup()
+
+        live = timed(live_ranking, 20)
+        recompute = timed(lambda: compute_ranking(app.config['POPULAR_ITEMS_TOP_N'], 30), 20)
+        popular_products(days=30)
+        cached = timed(lambda: popular_products(days=30), 1000)
+    client.get('/popular_items')
+    page = timed(lambda: client.get('/popular_items'), 200)
+
+    print(f'\n{count} orders: live query {live:.2f} ms, ranking from the rollup {recompute:.2f} ms, '
+          f'cached ranking {cached:.4f} ms, cached page {page:.2f} ms')
+    assert cached < live / 100
@@ -0,0 +1,46 @@
+import pytest
+from app.models import Order
+from conftest import fill_cart, login, query_count
+
+# statements per request, whatever the number of items. a lazy load per item makes these fail.
+# /checkout and /place_order also load the user row for the address
+CART_QUERIES = 2
+CHECKOUT_QUERIES = 3
+PLACE_ORDER_QUERIES = 6
+ORDER_DETAILS_QUERIES = 3
+
+
+@pytest.mark.parametrize('items', [1, 6])
+def test_cart_pages(app, client, shop, items):
+    fill_cart(app, shop['customer'], shop['products'][:items])
+    login(client, 'customer')
+
+    assert query_count(client.get('/cart')) == CART_QUERIES
+    assert query_count(client.get('/checkout')) == CHECKOUT_QUERIES
+
+
+@pytest.mark.parametrize('items', [1, 6])
+def test_place_order(app, client, shop, items):
+    fill_cart(app, shop['customer'], shop['products'][:items])
+    login(client, 'customer')
+
+    response = client.post('/place_order')
+
+    assert response.headers['Location'] == '/index'
+    assert query_count(response) == PLACE_ORDER_QUERIES
+
+
+@pytest.mark.parametrize('items', [1, 6])
+def test_order_details(app, client, shop, items):
+    fill_cart(app, shop['customer'], shop['products'][:items])
+    login(client, 'customer')
+    client.post('/place_order')
+    client.get('/logout')
+    with app.app_context():
+        order_id = Order.query.one().id
+    login(client, 'admin')
+
+    response = client.get(f'/order/{order_id}')
+
+    assert response.status_code == 200
+    assert query_count(response) == ORDER_DETAILS_QUERIES
@@ -0,0 +1,105 @@
+import itertools
+import random
+import re
+import statistics
+import time
+
+import pytest
+import sqlalchemy as sa
+
+from app import db
+from app.models import Product
+from app.search import search_products, SEARCH_PER_PAGE
+
+
+def add_products(app, category_id, *products):
+    with app.app_context():
+        db.session.add_all([Product(name=name, description=description, price=1, category_id=category_id,
+                                    image_filename='candle.jpg') for name, description in products])
+        db.session.commit()
+
+
+def result_names(response):
+    return re.findall(r'class="card-title"><a class="text-link" href="[^"]*">([^<]*)</a>', response.get_data(as_text=True))
+
+
+def test_a_name_match_ranks_above_a_description_match(app, client, shop):
+    add_products(app, shop['categories'][1], ('Miniature stand', 'Fits a dragon figure'), ('Dragon', 'A red one'))
+
+    assert result_names(client.get('/search?q=dragon')) == ['Dragon', 'Miniature stand']
+
+
+def test_the_words_match_as_prefixes_and_without_accents(app, client, shop):
+    add_products(app, shop['categories'][0], ('Crème Brûlée Candle', 'Smells like dessert'))
+
+    assert result_names(client.get('/search?q=brul+cand')) == ['Crème Brûlée Candle']
+    assert 'Crème Brûlée Candle' in result_names(client.get('/search?q=creme'))
+    assert result_names(client.get('/search?q=brul+dice')) == []
+
+
+def test_the_category_name_is_searched_too(app, client, shop):
+    add_products(app, shop['categories'][1], ('Polyhedral set', 'Seven pieces'))
+
+    assert 'Polyhedral set' in result_names(client.get('/search?q=dice'))
+
+
+def test_results_are_paged(app, client, shop):
+    add_products(app, shop['categories'][0], *[(f'Tea light {i}', 'Small') for i in range(SEARCH_PER_PAGE + 2)])
+
+    first = client.get('/search?q=tea+light')
+    second = client.get('/search?q=tea+light&page=2')
+
+    assert len(result_names(first)) == SEARCH_PER_PAGE
+    assert len(result_names(second)) == 2
+    assert not set(result_names(first)) & set(result_names(second))
+    assert 'page=2' in first.get_data(as_text=True)
+    assert 'Previous' in second.get_data(as_text=True)
+
+
+def test_an_empty_search_asks_for_a_query(client, shop):
+    assert 'Type a product' in client.get('/search?q=+').get_data(as_text=True)
+
+
+# a made up vocabulary where a few words are common and most are rare, like the words in a real catalog
+def seeded_words(rng, size=3000):
+    syllables = ['ka', 'lo', 'mi', 'ra', 'ten', 'dor', 'vel', 'sha', 'qui', 'bre', 'nox', 'fi', 'lu', 'gar', 'pen', 'tro']
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 3))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, size + 1)))
+
+
+@pytest.mark.benchmark
+def test_search_latency(app, shop):
+    count = 100000
+    rng = random.Random(21)
+    words, cum_weights = seeded_words(rng)
+    with app.app_context():
+        db.session.execute(sa.insert(Product), [
+            {'name': ' '.join(rng.choices(words, cum_weights=cum_weights, k=3)),
+             'description': ' '.join(rng.choices(words, cum_weights=cum_weights, k=12)), 'price': 1,
+             'category_id': shop['categories'][i % 2], 'image_filename': 'candle.jpg'} for i in range(count)])
+        db.session.commit()
+
+        # typical queries: one or two words that aren't among the very common ones, the last one typed halfway
+        queries = [' '.join(rng.sample(words[20:], rng.randint(1, 2)))[:-2] for _ in range(200)]
+        timings = []
+        for q in queries:
+            start = time.perf_counter()
+            search_products(q).items
+            timings.append((time.perf_counter() - start) * 1000)
+        # the most common words match a large part of the catalog and every match gets ranked
+        broad = {}
+        for q in words[:3]:
+            start = time.perf_counter()
+            products = search_products(q)
+            products.items
+            broad[q] = (products.total, (time.perf_counter() - start) * 1000)
+
+    median, p95 = statistics.median(timings), statistics.quantiles(timings, n=20)[18]
+    print(f'\nsearch over {count} products: median {median:.2f} ms, p95 {p95:.2f} ms')
+    for q, (total, elapsed) in broad.items():
+        print(f'broad search {q!r}: {total} matches in {elapsed:.0f} ms')
+    assert median < 10
@@ -0,0 +1,51 @@
+from app import db
+from app.models import Product, ProductSalesDay
+from app.stats import rebuild_sales_rollup
+from conftest import fill_cart, login
+
+
+def order(app, client, user_id, product_id, quantity):
+    fill_cart(app, user_id, [product_id], quantity=quantity)
+    assert client.post('/place_order').headers['Location'] == '/index'
+
+
+def rollup(app):
+    with app.app_context():
+        return {(row.product_id, row.units_sold, row.order_count, row.revenue)
+                for row in ProductSalesDay.query}
+
+
+def test_orders_of_one_product_on_one_day_add_up(app, client, shop):
+    login(client, 'customer')
+    product_id = shop['products'][0]
+    order(app, client, shop['customer'], product_id, 2)
+    order(app, client, shop['customer'], product_id, 3)
+
+    assert rollup(app) == {(product_id, 5, 2, 25.0)}
+
+
+def test_rebuild_gives_the_same_rollup(app, client, shop):
+    login(client, 'customer')
+    order(app, client, shop['customer'], shop['products'][0], 2)
+    order(app, client, shop['customer'], shop['products'][1], 1)
+    order(app, client, shop['customer'], shop['products'][0], 1)
+    recorded = rollup(app)
+
+    with app.app_context():
+        rebuild_sales_rollup()
+
+    assert rollup(app) == recorded
+
+
+def test_rebuild_keeps_the_price_paid(app, client, shop):
+    login(client, 'customer')
+    product_id = shop['products'][0]
+    order(app, client, shop['customer'], product_id, 2)
+    recorded = rollup(app)
+
+    with app.app_context():
+        db.session.get(Product, product_id).price = 99
+        db.session.commit()
+        rebuild_sales_rollup()
+
+    assert rollup(app) == recorded == {(product_id, 2, 1, 10.0)}
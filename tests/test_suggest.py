@@ -0,0 +1,114 @@
+import io
+import random
+import statistics
+import time
+
+import pytest
+import sqlalchemy as sa
+
+from app import db
+from app.cache import page_cache
+from app.models import Product
+from app import suggest as suggest_module
+from app.suggest import suggest, suggestions
+from conftest import login
+
+
+def delete_product_elsewhere(app, name):
+    # like another worker or the import-products command: no suggestions.remove() in this process
+    with app.app_context():
+        db.session.delete(Product.query.filter_by(name=name).one())
+        db.session.commit()
+
+
+def test_suggestions_reload_when_the_catalog_pages_are_invalidated(app, shop):
+    with app.test_request_context():
+        assert [name for kind, item_id, name in suggest('candle 1')] == ['Candle 1']
+
+        delete_product_elsewhere(app, 'Candle 1')
+        page_cache.invalidate('index')
+
+        assert suggest('candle 1') == []
+
+
+def test_suggestions_reload_after_the_ttl(app, shop):
+    with app.test_request_context():
+        assert suggest('dice 2')
+
+        delete_product_elsewhere(app, 'Dice 2')
+        assert suggest('dice 2')
+        suggestions.expires = 0
+
+        assert suggest('dice 2') == []
+
+
+def count_reloads(monkeypatch):
+    reloads = []
+    load = suggest_module.load_suggestions
+    monkeypatch.setattr(suggest_module, 'load_suggestions', lambda version=None: reloads.append(version) or load(version))
+    return reloads
+
+
+def test_an_admin_change_updates_the_suggestions_without_a_reload(app, client, shop, monkeypatch):
+    login(client, 'admin')
+    with app.test_request_context():
+        assert suggest('candle 1')
+    reloads = count_reloads(monkeypatch)
+
+    client.post('/manage_shop_data', data={'add_product': '1', 'name': 'Tea Light', 'description': 'A small candle',
+                                           'price': '2', 'category': shop['categories'][0],
+                                           'image': (io.BytesIO(b''), '')})
+    client.post('/manage_shop_data', data={'delete_product': '1', 'product_id': shop['products'][1]})
+
+    with app.test_request_context():
+        assert [name for kind, item_id, name in suggest('tea')] == ['Tea Light']
+        assert suggest('candle 1') == []
+    assert reloads == []
+    assert suggestions.version == page_cache.version('index')
+
+
+def test_a_change_elsewhere_in_between_still_reloads(app, shop, monkeypatch):
+    with app.test_request_context():
+        assert suggest('dice 2')
+        reloads = count_reloads(monkeypatch)
+        delete_product_elsewhere(app, 'Dice 2')
+        page_cache.invalidate('index')
+
+        with suggest_module.local_catalog_change():
+            suggestions.remove('product', shop['products'][0])
+            page_cache.invalidate('index')
+
+        assert suggest('dice 2') == []
+        assert len(reloads) == 1
+
+
+@pytest.mark.benchmark
+def test_suggest_latency_with_local_changes(app, shop):
+    count = 100000
+    words = ['candle', 'dice', 'scented', 'metal', 'wooden', 'dragon', 'set', 'tray', 'mini', 'deluxe']
+    rng = random.Random(22)
+    with app.app_context():
+        db.session.execute(sa.insert(Product), [
+            {'name': f'{rng.choice(words)} {rng.choice(words)} {i}', 'description': 'seeded', 'price': 1,
+             'category_id': shop['categories'][i % 2], 'image_filename': 'candle.jpg'} for i in range(count)])
+        db.session.commit()
+
+    timings = []
+    with app.test_request_context():
+        start = time.perf_counter()
+        suggest('candle')
+        print(f'\nfirst load of {count} products: {(time.perf_counter() - start) * 1000:.0f} ms')
+        for i in range(5000):
+            if i % 100 == 0:
+                # what the admin views do for every product they add
+                with suggest_module.local_catalog_change():
+                    suggestions.add('product', count + i, f'{rng.choice(words)} new {i}')
+                    page_cache.invalidate('index')
+            prefix = rng.choice(words)[:rng.randint(1, 6)]
+            start = time.perf_counter()
+            suggest(prefix)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    p50, p99 = statistics.median(timings), statistics.quantiles(timings, n=100)[98]
+    print(f'suggest over {count} products with local changes: p50 {p50:.3f} ms, p99 {p99:.3f} ms')
+    assert p99 < 1